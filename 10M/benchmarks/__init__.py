@@ -0,0 +1,7 @@
+# Замеры производительности движка модели Изинга: python -m benchmarks
+# (из каталога 10M) печатает результаты, пишет JSON-отчёт и сравнивает его
+# с сохранённым базовым отчётом.
+from .cases import DEFAULT_SIZES, GROUPS, Benchmark, collect
+from .runner import compare, load, measure, run_suite, save
+
+__all__ = ["DEFAULT_SIZES", "GROUPS", "Benchmark", "collect", "compare", "load", "measure", "run_suite", "save"]
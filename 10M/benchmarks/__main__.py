@@ -0,0 +1,56 @@
+import argparse
+import os
+import sys
+
+# модули движка лежат рядом с пакетом, а не в установленном пакете
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from .cases import DEFAULT_SIZES, GROUPS, collect
+from .runner import compare, load, run_suite, save
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Замеры движка модели Изинга")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="Размеры решеток")
+    parser.add_argument("--groups", nargs="+", default=list(GROUPS), choices=GROUPS)
+    parser.add_argument("-k", "--filter", default=None, help="Регулярное выражение по имени замера")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Минимальная длительность серии, с")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("-o", "--output", default=None, help="Куда записать JSON-отчёт")
+    parser.add_argument("--baseline", default=None, help="Базовый JSON-отчёт для сравнения")
+    parser.add_argument(
+        "--threshold", type=float, default=0.2, help="Допустимое замедление относительно базы (0.2 — 20%%)"
+    )
+    args = parser.parse_args(argv)
+
+    def show(result):
+        print(
+            f"{result['name']:<48} {result['seconds'] * 1e3:10.3f} ms"
+            f"  {result['rate']:14.1f} {result['unit']}/s",
+            flush=True,
+        )
+
+    report = run_suite(
+        collect(args.sizes, args.groups),
+        pattern=args.filter,
+        min_time=args.min_time,
+        repeats=args.repeats,
+        on_result=show,
+    )
+    if args.output:
+        save(report, args.output)
+
+    if args.baseline is None:
+        return 0
+    rows = compare(report, load(args.baseline), args.threshold)
+    print()
+    for row in rows:
+        mark = "REGRESSION" if row["regression"] else ""
+        print(f"{row['name']:<48} x{row['ratio']:6.2f}  {mark}")
+    regressions = sum(row["regression"] for row in rows)
+    print(f"\n{regressions} regression(s) of {len(rows)} compared, threshold {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
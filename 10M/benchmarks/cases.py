@@ -0,0 +1,209 @@
+from typing import Callable, Dict, Iterator, List, Sequence
+
+import numpy as np
+
+import kernels
+from ising_model import (
+    ALGORITHMS,
+    STATE_ENCODINGS,
+    IsingModel2D,
+    find_critical_temperature,
+    scan_temperature_ferromagnetic,
+)
+from packed import PackedIsingModel2D
+
+DEFAULT_SIZES = (16, 64, 256, 1024)
+# температура вблизи T_c: кластеры кластерных алгоритмов типичного размера
+BENCH_T = 2.269
+BENCH_SEED = 12345
+# одиночные шаги стоят O(1) независимо от размера, поэтому на больших
+# решетках вызов ограничен этим числом попыток переворота
+MAX_FLIPS_PER_CALL = 1 << 16
+
+
+class Benchmark:
+    # Один замер: setup() готовит состояние вне замера и возвращает функцию
+    # без аргументов, которая выполняет работу и возвращает число единиц
+    # работы (unit) — по нему считается скорость
+    def __init__(self, name: str, group: str, params: Dict, unit: str, setup: Callable[[], Callable[[], float]]):
+        self.name = name
+        self.group = group
+        self.params = params
+        self.unit = unit
+        self.setup = setup
+
+
+def _engine_updates(size: int, algorithm: str, storage: str, backend: str) -> Callable[[], float]:
+    model_cls = PackedIsingModel2D if storage == "packed" else IsingModel2D
+    model = model_cls(size=size, T=BENCH_T, seed=BENCH_SEED, backend=backend)
+    n_attempts = min(size * size, MAX_FLIPS_PER_CALL)
+
+    # единица работы — фактически перевернутые спины: все алгоритмы их
+    # возвращают, и у кластерных шагов это единственная сравнимая мера
+    if algorithm == "metropolis":
+        def run() -> float:
+            accepted, _, _ = model.run_metropolis(n_attempts)
+            return accepted
+
+    else:
+        def run() -> float:
+            return model.update(algorithm)
+
+    return run
+
+
+def engine_benchmarks(sizes: Sequence[int]) -> Iterator[Benchmark]:
+    backends = ["python"] + (["numba"] if kernels.HAVE_NUMBA else [])
+    for size in sizes:
+        for algorithm in ALGORITHMS:
+            variants = [("int8", backend) for backend in backends] if algorithm == "metropolis" else [("int8", "auto")]
+            if algorithm == "checkerboard":
+                variants.append(("packed", "auto"))
+            for storage, backend in variants:
+                params = {"size": size, "algorithm": algorithm, "storage": storage, "backend": backend}
+                yield Benchmark(
+                    f"engine/{algorithm}/{storage}/{backend}/{size}",
+                    "engine",
+                    params,
+                    "flipped_spins",
+                    lambda params=params: _engine_updates(**params),
+                )
+
+
+def _energy(size: int) -> Callable[[], float]:
+    model = IsingModel2D(size=size, T=BENCH_T, seed=BENCH_SEED)
+
+    # calculate_energy берет накопленные суммы; _recompute_totals — полный
+    # пересчёт по решетке, который делается при загрузке состояния
+    def run() -> float:
+        model.calculate_energy()
+        model._recompute_totals()
+        return 1
+
+    return run
+
+
+def _state(size: int, encoding: str) -> Callable[[], float]:
+    model = IsingModel2D(size=size, T=BENCH_T, seed=BENCH_SEED)
+    rng = np.random.default_rng(BENCH_SEED)
+    last = {"version": None}
+
+    def run() -> float:
+        if encoding == "delta":
+            # типичный кадр анимации: немного изменившихся узлов с прошлого
+            model.flip_spin(*rng.integers(0, size, 2))
+        state = model.get_state(encoding, last["version"])
+        last["version"] = state["version"]
+        return 1
+
+    return run
+
+
+def observable_benchmarks(sizes: Sequence[int]) -> Iterator[Benchmark]:
+    for size in sizes:
+        yield Benchmark(f"energy/{size}", "observables", {"size": size}, "calls", lambda size=size: _energy(size))
+        for encoding in STATE_ENCODINGS:
+            yield Benchmark(
+                f"get_state/{encoding}/{size}",
+                "serialization",
+                {"size": size, "encoding": encoding},
+                "calls",
+                lambda size=size, encoding=encoding: _state(size, encoding),
+            )
+
+
+# небольшие сканирования целиком, в одном процессе: меряется сам расчёт,
+# а не запуск пула процессов
+SCAN_PARAMS = {
+    "ferromagnetic_scan": {
+        "size": 16,
+        "T_min": 1.5,
+        "T_max": 3.5,
+        "T_steps": 10,
+        "equilibration_steps": 500,
+        "measurement_steps": 500,
+        "seed": BENCH_SEED,
+        "n_workers": 1,
+    },
+    "find_critical_temperature": {
+        "size": 16,
+        "T_steps": 15,
+        "seed": BENCH_SEED,
+        "n_workers": 1,
+    },
+}
+SCAN_FUNCTIONS = {
+    "ferromagnetic_scan": scan_temperature_ferromagnetic,
+    "find_critical_temperature": find_critical_temperature,
+}
+
+
+def _scan(kind: str) -> Callable[[], float]:
+    def run() -> float:
+        SCAN_FUNCTIONS[kind](**SCAN_PARAMS[kind])
+        return 1
+
+    return run
+
+
+def scan_benchmarks() -> Iterator[Benchmark]:
+    for kind, params in SCAN_PARAMS.items():
+        yield Benchmark(f"scan/{kind}", "scan", dict(params), "scans", lambda kind=kind: _scan(kind))
+
+
+API_SIZE = 100
+
+
+def _api(endpoint: str) -> Callable[[], float]:
+    # сервер импортируется только здесь: он тянет fastapi и создает каталоги
+    from fastapi.testclient import TestClient
+
+    import server
+
+    client = TestClient(server.app)
+    response = client.post("/api/init", json={"size": API_SIZE, "T": BENCH_T, "encoding": "packed"})
+    session_id = response.json()["session_id"]
+    requests = {
+        "init": lambda: client.post("/api/init", json={"size": API_SIZE, "T": BENCH_T}),
+        "step": lambda: client.post(
+            "/api/step", json={"session_id": session_id, "n_steps": 1, "mode": "sweeps", "encoding": "packed"}
+        ),
+        "step_json": lambda: client.post(
+            "/api/step", json={"session_id": session_id, "n_steps": 1, "mode": "sweeps"}
+        ),
+        "lattice": lambda: client.get(f"/api/lattice/{session_id}"),
+    }
+
+    def run() -> float:
+        response = requests[endpoint]()
+        response.raise_for_status()
+        return 1
+
+    return run
+
+
+API_ENDPOINTS = ("init", "step", "step_json", "lattice")
+
+
+def api_benchmarks() -> Iterator[Benchmark]:
+    for endpoint in API_ENDPOINTS:
+        yield Benchmark(
+            f"api/{endpoint}",
+            "api",
+            {"endpoint": endpoint, "size": API_SIZE},
+            "requests",
+            lambda endpoint=endpoint: _api(endpoint),
+        )
+
+
+GROUPS = ("engine", "observables", "serialization", "scan", "api")
+
+
+def collect(sizes: Sequence[int] = DEFAULT_SIZES, groups: Sequence[str] = GROUPS) -> List[Benchmark]:
+    benchmarks = [
+        *engine_benchmarks(sizes),
+        *observable_benchmarks(sizes),
+        *scan_benchmarks(),
+        *api_benchmarks(),
+    ]
+    return [benchmark for benchmark in benchmarks if benchmark.group in groups]
@@ -0,0 +1,130 @@
+import json
+import os
+import platform
+import re
+import statistics
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+import kernels
+from ising_model import ALGORITHM_VERSION
+
+from .cases import Benchmark
+
+FORMAT_VERSION = 1
+
+
+def measure(run: Callable[[], float], min_time: float = 0.2, repeats: int = 5) -> Dict:
+    # Число вызовов в серии подбирается так, чтобы серия шла не меньше
+    # min_time; из repeats серий берётся медиана (минимум — для справки).
+    # Первый вызов — прогрев (компиляция numba, кэши), он не учитывается.
+    run()
+    calls = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(calls):
+            run()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or calls >= 1 << 20:
+            break
+        calls = max(calls * 2, int(calls * min_time / max(elapsed, 1e-9)))
+
+    times = []
+    units = 0.0
+    for _ in range(repeats):
+        units = 0.0
+        start = time.perf_counter()
+        for _ in range(calls):
+            units += run()
+        times.append((time.perf_counter() - start) / calls)
+    median = statistics.median(times)
+    units /= calls
+    return {
+        "calls": calls,
+        "repeats": repeats,
+        "seconds": median,
+        "seconds_min": min(times),
+        "units_per_call": units,
+        "rate": units / median,
+    }
+
+
+def environment() -> Dict:
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "numba": kernels.HAVE_NUMBA,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "algorithm_version": ALGORITHM_VERSION,
+    }
+
+
+def run_suite(
+    benchmarks: Sequence[Benchmark],
+    pattern: Optional[str] = None,
+    min_time: float = 0.2,
+    repeats: int = 5,
+    on_result: Optional[Callable[[Dict], None]] = None,
+) -> Dict:
+    results: List[Dict] = []
+    for benchmark in benchmarks:
+        if pattern is not None and not re.search(pattern, benchmark.name):
+            continue
+        result = {
+            "name": benchmark.name,
+            "group": benchmark.group,
+            "params": benchmark.params,
+            "unit": benchmark.unit,
+            **measure(benchmark.setup(), min_time=min_time, repeats=repeats),
+        }
+        results.append(result)
+        if on_result is not None:
+            on_result(result)
+    return {
+        "format": FORMAT_VERSION,
+        "created_at": time.time(),
+        "environment": environment(),
+        "results": results,
+    }
+
+
+def save(report: Dict, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+
+def load(path: str) -> Dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(report: Dict, baseline: Dict, threshold: float = 0.2) -> List[Dict]:
+    # Сравнение по скорости (единиц работы в секунду), а не по времени
+    # вызова: у Wolff работа одного вызова случайна. Регрессия — если замер
+    # медленнее базового больше чем в (1 + threshold) раз. Замеры, которых
+    # нет в базовом отчёте или которые считались в других единицах,
+    # пропускаются; нулевая скорость при ненулевой базовой — регрессия.
+    reference = {result["name"]: result for result in baseline["results"]}
+    rows = []
+    for result in report["results"]:
+        base = reference.get(result["name"])
+        if base is None or base.get("unit") != result["unit"]:
+            continue
+        if result["rate"] > 0:
+            ratio = base["rate"] / result["rate"]
+        else:
+            ratio = float("inf") if base["rate"] > 0 else 1.0
+        rows.append(
+            {
+                "name": result["name"],
+                "rate": result["rate"],
+                "baseline_rate": base["rate"],
+                "ratio": ratio,
+                "regression": ratio > 1.0 + threshold,
+            }
+        )
+    return rows
@@ -0,0 +1,112 @@
+import glob
+import json
+import os
+import struct
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+# Формат контрольной точки: MAGIC, длина JSON-заголовка (<u8), заголовок
+# {"header": ..., "arrays": {имя: dtype, shape, offset}} и сырые буферы
+# массивов, выровненные по ALIGN байт. Выравнивание позволяет открыть
+# любой массив через np.memmap без чтения файла целиком.
+MAGIC = b"ISINGCK1"
+ALIGN = 64
+
+
+def _aligned(n: int) -> int:
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def save_checkpoint(path: str, header: Dict, arrays: Dict[str, np.ndarray]):
+    # запись через временный файл: прерванное сохранение не портит прежнюю точку
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    table = {}
+    offset = 0
+    for name, array in arrays.items():
+        table[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += _aligned(array.nbytes)
+
+    meta = json.dumps({"header": header, "arrays": table}).encode()
+    prefix = MAGIC + struct.pack("<Q", len(meta)) + meta
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(prefix.ljust(_aligned(len(prefix)), b"\0"))
+        for array in arrays.values():
+            data = array.tobytes()
+            f.write(data.ljust(_aligned(len(data)), b"\0"))
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path: str, mmap: bool = True) -> Tuple[Dict, Dict[str, np.ndarray]]:
+    # С mmap=True массивы отображаются в режиме копирования при записи:
+    # восстановление не читает решетку, а изменения не попадают в файл
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError("Not an Ising checkpoint file")
+        (length,) = struct.unpack("<Q", f.read(8))
+        meta = json.loads(f.read(length))
+        data_start = _aligned(len(MAGIC) + 8 + length)
+
+        arrays = {}
+        for name, info in meta["arrays"].items():
+            dtype = np.dtype(info["dtype"])
+            shape = tuple(info["shape"])
+            count = int(np.prod(shape))
+            if mmap and count > 0:
+                arrays[name] = np.memmap(
+                    path, dtype=dtype, mode="c", offset=data_start + info["offset"], shape=shape
+                )
+            else:
+                f.seek(data_start + info["offset"])
+                arrays[name] = np.fromfile(f, dtype=dtype, count=count).reshape(shape)
+    return meta["header"], arrays
+
+
+class ScanCheckpoint:
+    # Контрольная точка сканирования: законченные точки по их идентификаторам
+    # лежат в основном файле, незаконченные — в файлах <path>.<id> со
+    # состоянием решетки и накопленными измерениями. Основной файл с
+    # параметрами пишется сразу при создании, поэтому файлы точек,
+    # прерванных до первой законченной, не теряются при продолжении;
+    # все файлы удаляются, только если параметры сканирования другие.
+    def __init__(self, path: str, params: Dict, interval: float = 60.0):
+        self.path = path
+        self.params = params
+        self.interval = interval
+        self.points: Dict[str, Dict] = {}
+        try:
+            header, _ = load_checkpoint(path, mmap=False)
+        except FileNotFoundError:
+            header = {"params": params, "points": {}}
+        except ValueError:
+            header = None
+        if header is not None and header.get("params") == params:
+            self.points = header["points"]
+        else:
+            self.remove()
+        self._save()
+
+    def _save(self):
+        save_checkpoint(self.path, {"params": self.params, "points": self.points}, {})
+
+    def point_path(self, point_id: str) -> str:
+        return f"{self.path}.{point_id}"
+
+    def get(self, point_id: str) -> Optional[Dict]:
+        return self.points.get(point_id)
+
+    def record(self, point_id: str, point: Dict):
+        self.points[point_id] = point
+        self._save()
+        try:
+            os.remove(self.point_path(point_id))
+        except FileNotFoundError:
+            pass
+
+    def remove(self):
+        for path in [self.path] + glob.glob(glob.escape(self.path) + ".*"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,300 @@
+import multiprocessing as mp
+import os
+import threading
+import time
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from ising_model import (
+    SeedLike,
+    ScanCancelled,
+    acceptance_table,
+    collect_scan_results,
+    temperature_observables,
+)
+
+# Доменная декомпозиция для решеток 1024²–8192²: решетка лежит в общей
+# памяти, каждый процесс владеет полосой строк и обновляет в ней шахматную
+# подрешетку. Граничные строки соседних полос (гало) копируются перед
+# каждым полупроходом, а барьер между полупроходами гарантирует, что соседи
+# уже закончили переворачивать спины другого цвета.
+
+# управляющий массив: число проходов (-1 — завершение), T, J, B; за ним
+# по три числа от каждого процесса: принятые перевороты, ΔM, Δbonds
+CONTROL_SIZE = 4
+STATS_SIZE = 3
+# ожидание на барьере, с: между полупроходами — одно на полупроход, у
+# родителя — на каждый проход вызова run_sweeps; по истечении барьер ломается
+BARRIER_TIMEOUT = 60.0
+# строк в блоке с собственным потоком случайных чисел; полосы процессов
+# состоят из целых блоков, поэтому при заданном seed траектория не зависит
+# от числа процессов (в пределах полупрохода порядок обновлений не важен)
+ROW_BLOCK = 16
+
+
+def _strip_worker(
+    index: int,
+    n_workers: int,
+    size: int,
+    row_start: int,
+    row_stop: int,
+    spins_name: str,
+    control_name: str,
+    seeds: List[np.random.SeedSequence],
+    start_barrier,
+    half_barrier,
+):
+    spins_shm = shared_memory.SharedMemory(name=spins_name)
+    control_shm = shared_memory.SharedMemory(name=control_name)
+    try:
+        spins = np.ndarray((size, size), dtype=np.int8, buffer=spins_shm.buf)
+        control = np.ndarray(
+            CONTROL_SIZE + STATS_SIZE * n_workers, dtype=np.float64, buffer=control_shm.buf
+        )
+        rngs = [np.random.default_rng(seed) for seed in seeds]
+        block_shapes = [
+            (min(ROW_BLOCK, row_stop - row), size) for row in range(row_start, row_stop, ROW_BLOCK)
+        ]
+        strip = spins[row_start:row_stop]
+        # строки полосы вместе с гало сверху и снизу (периодические границы)
+        halo_rows = np.arange(row_start - 1, row_stop + 1) % size
+        parity = (np.arange(row_start, row_stop)[:, None] + np.arange(size)[None, :]) % 2
+        masks = (parity == 0, parity == 1)
+
+        while True:
+            # простой между вызовами run_sweeps не ограничен по времени
+            start_barrier.wait()
+            n_sweeps = int(control[0])
+            if n_sweeps < 0:
+                break
+
+            table = acceptance_table(control[1], control[2], control[3])
+            accepted = dM = d_bonds = 0
+            for _ in range(n_sweeps):
+                for mask in masks:
+                    padded = spins[halo_rows]
+                    own = padded[1:-1]
+                    nb = padded[:-2] + padded[2:] + np.roll(own, 1, axis=1) + np.roll(own, -1, axis=1)
+                    prob = table[(own + 1) // 2, (nb + 4) // 2]
+                    rand = np.concatenate(
+                        [rng.random(shape) for rng, shape in zip(rngs, block_shapes)]
+                    )
+                    flip = mask & (rand < prob)
+                    flipped = own[flip]
+                    dM -= 2 * int(np.sum(flipped))
+                    d_bonds -= 2 * int(np.sum(flipped * nb[flip]))
+                    accepted += int(flipped.size)
+                    strip[flip] *= -1
+                    half_barrier.wait(BARRIER_TIMEOUT)
+
+            offset = CONTROL_SIZE + STATS_SIZE * index
+            control[offset : offset + STATS_SIZE] = (accepted, dM, d_bonds)
+            start_barrier.wait(BARRIER_TIMEOUT)
+    except threading.BrokenBarrierError:
+        # сбой другого процесса или родителя: выходим, ошибку сообщит родитель
+        start_barrier.abort()
+        half_barrier.abort()
+    except BaseException:
+        start_barrier.abort()
+        half_barrier.abort()
+        raise
+    finally:
+        spins_shm.close()
+        control_shm.close()
+
+
+class DomainDecomposedIsing2D:
+    # Шахматные проходы по большой решетке силами n_workers процессов.
+    # Размер должен быть чётным, иначе периодическая решетка не раскрашивается
+    # в два цвета. Процессы живут, пока модель не закрыта (close или with).
+    def __init__(
+        self,
+        size: int = 1024,
+        T: float = 2.269,
+        J: float = 1.0,
+        B: float = 0.0,
+        seed: SeedLike = None,
+        n_workers: Optional[int] = None,
+    ):
+        if size % 2:
+            raise ValueError("Lattice size must be even for domain decomposition")
+        if n_workers is None:
+            n_workers = os.cpu_count() or 1
+        n_blocks = -(-size // ROW_BLOCK)
+        n_workers = max(1, min(n_workers, n_blocks))
+
+        self.size = size
+        self.T = T
+        self.J = J
+        self.B = B
+        self.n_workers = n_workers
+
+        lattice_seed, *block_seeds = np.random.SeedSequence(seed).spawn(n_blocks + 1)
+        self._spins_shm = shared_memory.SharedMemory(create=True, size=size * size)
+        self._control_shm = shared_memory.SharedMemory(
+            create=True, size=8 * (CONTROL_SIZE + STATS_SIZE * n_workers)
+        )
+        self.spins = np.ndarray((size, size), dtype=np.int8, buffer=self._spins_shm.buf)
+        self.spins[:] = np.random.default_rng(lattice_seed).choice(
+            np.array([-1, 1], dtype=np.int8), size=(size, size)
+        )
+        self._control = np.ndarray(
+            CONTROL_SIZE + STATS_SIZE * n_workers, dtype=np.float64, buffer=self._control_shm.buf
+        )
+        self._recompute_totals()
+
+        ctx = mp.get_context()
+        self._start_barrier = ctx.Barrier(n_workers + 1)
+        self._half_barrier = half_barrier = ctx.Barrier(n_workers)
+        # границы полос — по границам блоков
+        blocks = np.linspace(0, n_blocks, n_workers + 1).astype(int)
+        bounds = np.minimum(blocks * ROW_BLOCK, size)
+        self._workers = [
+            ctx.Process(
+                target=_strip_worker,
+                args=(
+                    k, n_workers, size, int(bounds[k]), int(bounds[k + 1]),
+                    self._spins_shm.name, self._control_shm.name,
+                    block_seeds[blocks[k] : blocks[k + 1]],
+                    self._start_barrier, half_barrier,
+                ),
+                daemon=True,
+            )
+            for k in range(n_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+        self._closed = False
+        # процесс, завершившийся до close (исключение, OOM, kill), ломает
+        # барьеры, чтобы родитель и остальные процессы не ждали его вечно
+        threading.Thread(target=self._watch_workers, daemon=True).start()
+
+    def _watch_workers(self):
+        wait([worker.sentinel for worker in self._workers])
+        if not self._closed:
+            self._start_barrier.abort()
+            self._half_barrier.abort()
+
+    def _failure(self) -> RuntimeError:
+        self.close()
+        failed = [
+            f"{k} (exit code {worker.exitcode})"
+            for k, worker in enumerate(self._workers)
+            if worker.exitcode
+        ]
+        if failed:
+            return RuntimeError("Domain worker failed: " + ", ".join(failed))
+        return RuntimeError(f"Domain workers did not reach the barrier within {BARRIER_TIMEOUT} s")
+
+    def _recompute_totals(self):
+        s = self.spins
+        self._M = int(np.sum(s, dtype=np.int64))
+        self._bonds = int(
+            np.sum(s * np.roll(s, -1, axis=1), dtype=np.int64)
+            + np.sum(s * np.roll(s, -1, axis=0), dtype=np.int64)
+        )
+
+    def run_sweeps(self, n_sweeps: int) -> int:
+        if self._closed:
+            raise RuntimeError("Model is closed")
+        self._control[:CONTROL_SIZE] = (n_sweeps, self.T, self.J, self.B)
+        try:
+            self._start_barrier.wait(BARRIER_TIMEOUT)
+            self._start_barrier.wait(BARRIER_TIMEOUT * max(1, n_sweeps))
+        except threading.BrokenBarrierError:
+            raise self._failure() from None
+
+        stats = self._control[CONTROL_SIZE:].reshape(self.n_workers, STATS_SIZE)
+        accepted, dM, d_bonds = (int(value) for value in stats.sum(axis=0))
+        self._M += dM
+        self._bonds += d_bonds
+        return accepted
+
+    def sweep(self) -> int:
+        return self.run_sweeps(1)
+
+    def total_magnetization(self) -> int:
+        return self._M
+
+    def calculate_magnetization(self) -> float:
+        return float(self._M / (self.size * self.size))
+
+    def calculate_energy(self) -> float:
+        return float(-self.J * self._bonds - self.B * self._M)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._control[0] = -1
+        try:
+            self._start_barrier.wait(BARRIER_TIMEOUT)
+        except threading.BrokenBarrierError:
+            # процессы уже вышли или сломали барьер — ждать некого
+            self._start_barrier.abort()
+        # общий срок на все процессы: процесс, убитый внутри барьера, может
+        # оставить его блокировку занятой, и остальные тогда не выйдут сами
+        deadline = time.monotonic() + 5
+        for worker in self._workers:
+            worker.join(timeout=max(0.0, deadline - time.monotonic()))
+            if worker.is_alive():
+                worker.terminate()
+                worker.join(timeout=1)
+        del self.spins, self._control
+        self._spins_shm.close()
+        self._spins_shm.unlink()
+        self._control_shm.close()
+        self._control_shm.unlink()
+
+    def __enter__(self) -> "DomainDecomposedIsing2D":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def scan_large_lattice(
+    size: int = 1024,
+    J: float = 1.0,
+    B: float = 0.0,
+    T_min: float = 2.0,
+    T_max: float = 2.6,
+    T_steps: int = 7,
+    equilibration_sweeps: int = 200,
+    measurement_sweeps: int = 200,
+    seed: Optional[int] = None,
+    n_workers: Optional[int] = None,
+    on_point: Optional[Callable[[Dict], None]] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+) -> Dict:
+    # Одна решетка охлаждается от T_max к T_min: каждая температура стартует
+    # с равновесной конфигурации предыдущей, что сокращает установление.
+    # Точки поэтому не независимы, в отличие от scan_temperature_ferromagnetic.
+    N_total = size * size
+    points: List[Dict] = []
+    with DomainDecomposedIsing2D(size=size, T=T_max, J=J, B=B, seed=seed, n_workers=n_workers) as model:
+        for T in np.linspace(T_max, T_min, T_steps):
+            model.T = float(T)
+            for _ in range(equilibration_sweeps):
+                if should_stop is not None and should_stop():
+                    raise ScanCancelled()
+                model.sweep()
+
+            magnetizations = np.empty(measurement_sweeps)
+            energies = np.empty(measurement_sweeps)
+            for k in range(measurement_sweeps):
+                if should_stop is not None and should_stop():
+                    raise ScanCancelled()
+                model.sweep()
+                magnetizations[k] = model.total_magnetization()
+                energies[k] = model.calculate_energy()
+
+            point = temperature_observables(T, magnetizations, energies, N_total)
+            points.append(point)
+            if on_point is not None:
+                on_point(point)
+
+    return collect_scan_results(points[::-1])
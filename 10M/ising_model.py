@@ -1,24 +1,215 @@
+import base64
+import os
+import time
 import numpy as np
-from typing import Dict, List, Tuple
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import lru_cache, partial
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import kernels
+import mc_statistics
+from checkpoint import ScanCheckpoint, load_checkpoint, save_checkpoint
+from reweighting import energy_histogram, multiple_histogram, reweight_scan
+
+ALGORITHMS = ("metropolis", "checkerboard", "wolff", "swendsen_wang")
+BATCHED_ALGORITHMS = ("metropolis", "checkerboard")
+# Предел числа обновлений за один вызов API или кадр трансляции: проход и
+# кластерное обновление решетки 100x100 в тысячи раз дороже одиночного
+# шага, вызов должен укладываться примерно в секунду
+UPDATE_LIMITS = {
+    "metropolis": 10000,
+    "checkerboard": 1000,
+    "wolff": 100,
+    "swendsen_wang": 300,
+}
+# Увеличивается при любом изменении, влияющем на численные результаты
+# сканирований: по нему кэш результатов отбрасывает устаревшие записи
+ALGORITHM_VERSION = 2
+
+SeedLike = Union[None, int, np.random.SeedSequence]
+
+STATE_ENCODINGS = ("json", "packed", "delta")
+
+
+class ScanCancelled(Exception):
+    pass
+
+
+@lru_cache(maxsize=32)
+def _sublattice_masks(size: int) -> Tuple[np.ndarray, ...]:
+    # При чётном size — обычная шахматная раскраска; при нечётном периодические
+    # границы замыкают одноцветные узлы, поэтому раскрашиваем жадно (3 цвета).
+    if size % 2 == 0:
+        colors = np.add.outer(np.arange(size), np.arange(size)) % 2
+    else:
+        colors = np.full((size, size), -1, dtype=int)
+        for i in range(size):
+            for j in range(size):
+                used = {
+                    colors[(i - 1) % size, j],
+                    colors[(i + 1) % size, j],
+                    colors[i, (j - 1) % size],
+                    colors[i, (j + 1) % size],
+                }
+                c = 0
+                while c in used:
+                    c += 1
+                colors[i, j] = c
+
+    masks = []
+    for c in range(int(colors.max()) + 1):
+        mask = colors == c
+        mask.setflags(write=False)
+        masks.append(mask)
+    return tuple(masks)
+
+
+@lru_cache(maxsize=32)
+def _neighbor_table(size: int) -> Tuple[Tuple[int, ...], ...]:
+    idx = np.arange(size * size).reshape(size, size)
+    table = np.stack(
+        [
+            np.roll(idx, -1, axis=0).ravel(),
+            np.roll(idx, 1, axis=0).ravel(),
+            np.roll(idx, -1, axis=1).ravel(),
+            np.roll(idx, 1, axis=1).ravel(),
+        ],
+        axis=1,
+    )
+    return tuple(map(tuple, table.tolist()))
+
+
+def _cluster_labels(right: np.ndarray, down: np.ndarray) -> np.ndarray:
+    # Связные компоненты по активным связям: подвешивание корней к меньшему
+    # корню + сжатие путей, всё на массивах без обхода в Python
+    N = right.shape[0]
+    idx = np.arange(N * N).reshape(N, N)
+    a = np.concatenate([idx[right], idx[down]])
+    b = np.concatenate([np.roll(idx, -1, axis=1)[right], np.roll(idx, -1, axis=0)[down]])
+
+    labels = np.arange(N * N)
+    while True:
+        la, lb = labels[a], labels[b]
+        changed = la != lb
+        if not changed.any():
+            break
+        np.minimum.at(
+            labels,
+            np.maximum(la, lb)[changed],
+            np.minimum(la, lb)[changed],
+        )
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+
+    return np.unique(labels, return_inverse=True)[1]
+
+
+def acceptance_table(T: float, J: float, B: float, kB: float = 1.0) -> np.ndarray:
+    # ΔE = 2·s·(J·Σsⱼ + B) принимает только 10 значений: s ∈ {-1, 1}, Σsⱼ ∈ {-4..4};
+    # строка — (s + 1) // 2, столбец — (Σsⱼ + 4) // 2
+    s = np.array([-1, 1])[:, None]
+    nb = np.arange(-4, 5, 2)[None, :]
+    dE = 2 * s * (J * nb + B)
+    with np.errstate(over="ignore"):
+        return np.minimum(1.0, np.exp(-dE / (kB * T)))
+
+
+def pack_lattice(spins: np.ndarray) -> bytes:
+    # построчно, старший бит первым: 1 — спин +1, 0 — спин -1
+    return np.packbits(np.asarray(spins).ravel() > 0).tobytes()
+
+
+def changed_sites(old: bytes, new: bytes, n_sites: int) -> np.ndarray:
+    diff = np.frombuffer(old, dtype=np.uint8) ^ np.frombuffer(new, dtype=np.uint8)
+    return np.flatnonzero(np.unpackbits(diff)[:n_sites])
 
 
 class IsingModel2D:
-    def __init__(self, size: int = 30, T: float = 1.0, J: float = 1.0, B: float = 0.0):
+    storage = "int8"
+
+    def __init__(
+        self,
+        size: int = 30,
+        T: float = 1.0,
+        J: float = 1.0,
+        B: float = 0.0,
+        seed: SeedLike = None,
+        backend: str = "auto",
+    ):
         self.size = size
         self.T = T
         self.J = J
         self.B = B
         self.kB = 1.0
-        self.spins = np.random.choice([-1, 1], size=(size, size))
+        # реализация последовательного Metropolis: auto, numba или python
+        kernels.resolve_backend(backend)
+        self.backend = backend
+        self.rng = np.random.default_rng(seed)
+        self.spins = self.rng.choice(np.array([-1, 1], dtype=np.int8), size=(size, size))
+        self._table_key = None
+        self._recompute_totals()
+        # версия решетки растёт при каждом изменении через публичные методы;
+        # снимки отправленных клиенту версий нужны для дельта-кодирования
+        self.version = 0
+        self._snapshots: deque = deque(maxlen=16)
 
     def set_spins(self, spins: List[List[int]]):
-        self.spins = np.array(spins)
+        spins = np.asarray(spins)
+        if spins.ndim != 2 or spins.shape[0] != spins.shape[1]:
+            raise ValueError("Spins must be a square matrix")
+        if not np.isin(spins, (-1, 1)).all():
+            raise ValueError("Spins must be -1 or 1")
+        self.size = spins.shape[0]
+        self.spins = spins.astype(np.int8)
+        self._recompute_totals()
+        self.version += 1
 
     def get_spins(self) -> List[List[int]]:
         return self.spins.tolist()
 
+    def _recompute_totals(self):
+        # Суммы, по которым энергия и намагниченность считаются за O(1):
+        # M = Σ sᵢ, bonds = Σ⟨i,j⟩ sᵢ·sⱼ, E = -J·bonds - B·M
+        self._M = int(np.sum(self.spins))
+        self._bonds = int(
+            np.sum(self.spins * np.roll(self.spins, -1, axis=1))
+            + np.sum(self.spins * np.roll(self.spins, -1, axis=0))
+        )
+
+    def _update_acceptance_table(self):
+        key = (self.T, self.J, self.B, self.kB)
+        if self._table_key != key:
+            self._table = acceptance_table(self.T, self.J, self.B, self.kB)
+            self._table_rows = self._table.tolist()
+            self._table_key = key
+
+    def _site_neighbor_sum(self, i: int, j: int) -> int:
+        N = self.size
+        return int(
+            self.spins[(i + 1) % N, j]
+            + self.spins[(i - 1) % N, j]
+            + self.spins[i, (j + 1) % N]
+            + self.spins[i, (j - 1) % N]
+        )
+
+    def _check_site(self, i: int, j: int):
+        # без проверки отрицательный или выходящий за край индекс у упакованной
+        # решетки попал бы в чужой бит, а M и bonds изменились бы как для другого узла
+        if not (0 <= i < self.size and 0 <= j < self.size):
+            raise IndexError(f"Site ({i}, {j}) is outside the {self.size}x{self.size} lattice")
+
     def flip_spin(self, i: int, j: int):
-        self.spins[i, j] *= -1
+        self._check_site(i, j)
+        s = int(self.spins[i, j])
+        nb = self._site_neighbor_sum(i, j)
+        self.spins[i, j] = -s
+        self._M -= 2 * s
+        self._bonds -= 2 * s * nb
+        self.version += 1
 
     def local_energy(self, i: int, j: int) -> float:
         spin = self.spins[i, j]
@@ -38,67 +229,689 @@ class IsingModel2D:
         return E
 
     def metropolis_step(self) -> bool:
-        i = np.random.randint(0, self.size)
-        j = np.random.randint(0, self.size)
+        i = self.rng.integers(0, self.size)
+        j = self.rng.integers(0, self.size)
 
-        E_before = self.local_energy(i, j)
+        self._update_acceptance_table()
+        s = int(self.spins[i, j])
+        nb = self._site_neighbor_sum(i, j)
+        p = self._table_rows[(s + 1) // 2][(nb + 4) // 2]
 
-        self.spins[i, j] *= -1
+        if p >= 1.0 or self.rng.random() < p:
+            self.spins[i, j] = -s
+            self._M -= 2 * s
+            self._bonds -= 2 * s * nb
+            return True
+        return False
 
-        E_after = self.local_energy(i, j)
+    def run_metropolis(self, n_steps: int, trace: bool = False) -> Tuple[int, np.ndarray, np.ndarray]:
+        # n шагов metropolis_step одним вызовом ядра из kernels; с trace
+        # возвращает M и bonds после каждого шага (для измерений в сканах)
+        self._update_acceptance_table()
+        spins = self.spins
+        accepted, self._M, self._bonds, m_trace, bond_trace = kernels.run_metropolis(
+            np.asarray(spins), self._table, self.rng, n_steps,
+            self._M, self._bonds, self.backend, trace,
+        )
+        self.spins = spins
+        return accepted, m_trace, bond_trace
 
-        dE = E_after - E_before
+    def run_steps(self, n_steps: int) -> Tuple[int, List[List[int]]]:
+        accepted, _, _ = self.run_metropolis(n_steps)
 
-        if dE <= 0 or np.random.random() < np.exp(-dE / (self.kB * self.T)):
-            return True
-        else:
-            self.spins[i, j] *= -1
-            return False
+        self.version += 1
+        return accepted, self.get_spins()
 
-    def run_steps(self, n_steps: int) -> Tuple[int, List[List[int]]]:
+    def neighbor_sum(self) -> np.ndarray:
+        s = self.spins
+        return (
+            np.roll(s, 1, axis=0)
+            + np.roll(s, -1, axis=0)
+            + np.roll(s, 1, axis=1)
+            + np.roll(s, -1, axis=1)
+        )
+
+    def sweep(self) -> int:
+        self._update_acceptance_table()
         accepted = 0
-        for _ in range(n_steps):
-            if self.metropolis_step():
-                accepted += 1
+        for mask in _sublattice_masks(self.size):
+            nb = self.neighbor_sum()
+            prob = self._table[(self.spins + 1) // 2, (nb + 4) // 2]
+            flip = mask & (self.rng.random(self.spins.shape) < prob)
+            # узлы одной подрешетки не соседи, поэтому вклады переворотов складываются
+            flipped = self.spins[flip]
+            self._M -= 2 * int(np.sum(flipped))
+            self._bonds -= 2 * int(np.sum(flipped * nb[flip]))
+            self.spins[flip] *= -1
+            accepted += int(flipped.size)
+        return accepted
 
+    def run_sweeps(self, n_sweeps: int) -> Tuple[int, List[List[int]]]:
+        accepted = 0
+        for _ in range(n_sweeps):
+            accepted += self.sweep()
+
+        self.version += 1
         return accepted, self.get_spins()
 
+    def _bond_probability(self) -> float:
+        # Связь активна между «удовлетворёнными» соседями (J·sᵢ·sⱼ > 0)
+        return float(1.0 - np.exp(-2.0 * abs(self.J) / (self.kB * self.T)))
+
+    def wolff_step(self) -> int:
+        N = self.size
+        p_add = self._bond_probability()
+        sign = 1 if self.J >= 0 else -1
+        flat = self.spins.ravel().tolist()
+        neighbors = _neighbor_table(N)
+
+        start = int(self.rng.integers(0, N * N))
+        in_cluster = bytearray(N * N)
+        in_cluster[start] = 1
+        cluster = [start]
+        for site in cluster:
+            target = sign * flat[site]
+            for nbr in neighbors[site]:
+                if not in_cluster[nbr] and flat[nbr] == target and self.rng.random() < p_add:
+                    in_cluster[nbr] = 1
+                    cluster.append(nbr)
+
+        # связи кластера с остальной решеткой не меняют энергию по построению,
+        # поле B учитывается отдельным шагом принятия
+        dE_field = 2.0 * self.B * sum(flat[site] for site in cluster)
+        if dE_field > 0 and self.rng.random() >= np.exp(-dE_field / (self.kB * self.T)):
+            return 0
+
+        rows, cols = np.divmod(np.array(cluster), N)
+        spins = self.spins
+        spins[rows, cols] *= -1
+        # присваиваем обратно, чтобы упакованное хранение могло перепаковать решетку
+        self.spins = spins
+        self._recompute_totals()
+        return len(cluster)
+
+    def swendsen_wang_step(self) -> int:
+        N = self.size
+        s = self.spins
+        p_add = self._bond_probability()
+        sign = 1 if self.J >= 0 else -1
+
+        right = (sign * s * np.roll(s, -1, axis=1) > 0) & (self.rng.random((N, N)) < p_add)
+        down = (sign * s * np.roll(s, -1, axis=0) > 0) & (self.rng.random((N, N)) < p_add)
+        labels = _cluster_labels(right, down)
+
+        # тепловая ванна для каждого кластера в поле B: P(flip) = 1 / (1 + exp(2·B·Σs/kT))
+        cluster_sum = np.bincount(labels, weights=s.ravel())
+        p_flip = 0.5 * (1.0 - np.tanh(self.B * cluster_sum / (self.kB * self.T)))
+        flip = (self.rng.random(cluster_sum.size) < p_flip)[labels].reshape(N, N)
+
+        s[flip] *= -1
+        self.spins = s
+        self._recompute_totals()
+        return int(np.count_nonzero(flip))
+
+    def update(self, algorithm: str = "metropolis") -> int:
+        if algorithm == "metropolis":
+            return int(self.metropolis_step())
+        if algorithm == "checkerboard":
+            return self.sweep()
+        if algorithm == "wolff":
+            return self.wolff_step()
+        if algorithm == "swendsen_wang":
+            return self.swendsen_wang_step()
+        raise ValueError(f"Unknown algorithm: {algorithm}")
+
+    def run_updates(self, n_updates: int, algorithm: str = "metropolis") -> int:
+        accepted = 0
+        if algorithm == "metropolis":
+            accepted, _, _ = self.run_metropolis(n_updates)
+        else:
+            for _ in range(n_updates):
+                accepted += self.update(algorithm)
+
+        self.version += 1
+        return accepted
+
+    def total_magnetization(self) -> int:
+        return self._M
+
     def calculate_magnetization(self) -> float:
-        return float(np.sum(self.spins) / (self.size * self.size))
+        return float(self._M / (self.size * self.size))
 
     def calculate_energy(self) -> float:
-        E_field = -self.B * np.sum(self.spins)
-        E_right = -self.J * np.sum(self.spins * np.roll(self.spins, -1, axis=1))
-        E_down = -self.J * np.sum(self.spins * np.roll(self.spins, -1, axis=0))
+        return float(-self.J * self._bonds - self.B * self._M)
 
-        return float(E_field + E_right + E_down)
+    @property
+    def lattice_buffer(self) -> np.ndarray:
+        # массив, в котором физически хранится решетка (для сохранения без копий)
+        return self.spins
 
-    def get_state(self) -> Dict:
+    @lattice_buffer.setter
+    def lattice_buffer(self, buffer: np.ndarray):
+        self.spins = buffer
+
+    def export_state(self) -> Dict:
         return {
-            "spins": self.get_spins(),
+            "storage": self.storage,
+            "size": self.size,
+            "T": self.T,
+            "J": self.J,
+            "B": self.B,
+            "kB": self.kB,
+            "M": self._M,
+            "bonds": self._bonds,
+            "version": self.version,
+            "backend": self.backend,
+            "rng": self.rng.bit_generator.state,
+        }
+
+    def load_state(self, state: Dict):
+        self.size = state["size"]
+        self.T = state["T"]
+        self.J = state["J"]
+        self.B = state["B"]
+        self.kB = state["kB"]
+        self._M = state["M"]
+        self._bonds = state["bonds"]
+        self.version = state["version"]
+        self.backend = state.get("backend", "auto")
+        self.rng.bit_generator.state = state["rng"]
+
+    @classmethod
+    def from_buffer(cls, state: Dict, buffer: np.ndarray) -> "IsingModel2D":
+        # восстановление без копирования решетки: buffer может быть np.memmap
+        model = cls.__new__(cls)
+        model.rng = np.random.default_rng()
+        model._table_key = None
+        model._snapshots = deque(maxlen=16)
+        model.lattice_buffer = buffer
+        model.load_state(state)
+        return model
+
+    @property
+    def nbytes(self) -> int:
+        # память решетки вместе со снимками для дельта-кодирования
+        return int(self.spins.nbytes) + sum(len(snapshot) for _, snapshot in self._snapshots)
+
+    def lattice_bytes(self) -> bytes:
+        packed = pack_lattice(self.spins)
+        if not self._snapshots or self._snapshots[-1][0] != self.version:
+            self._snapshots.append((self.version, packed))
+        return packed
+
+    def lattice_delta(self, since_version: Optional[int]) -> Optional[np.ndarray]:
+        # Номера узлов (построчно), изменившихся с версии since_version,
+        # или None, если такой снимок уже вытеснен и нужен полный кадр
+        packed = self.lattice_bytes()
+        for version, snapshot in self._snapshots:
+            if version == since_version and len(snapshot) == len(packed):
+                return changed_sites(snapshot, packed, self.size * self.size)
+        return None
+
+    def get_state(self, encoding: str = "json", since_version: Optional[int] = None) -> Dict:
+        state = {
             "magnetization": self.calculate_magnetization(),
             "energy": self.calculate_energy(),
             "size": self.size,
             "T": self.T,
             "J": self.J,
             "B": self.B,
+            "version": self.version,
+            "encoding": encoding,
         }
 
+        if encoding == "json":
+            state["spins"] = self.get_spins()
+            return state
+
+        if encoding == "delta":
+            changed = self.lattice_delta(since_version)
+            # список номеров выгоднее полного кадра, пока изменилось мало узлов
+            if changed is not None and changed.size * 5 < self.size * self.size // 6:
+                state["base_version"] = since_version
+                state["changed"] = changed.tolist()
+                return state
+
+        state["encoding"] = "packed"
+        state["spins_packed"] = base64.b64encode(self.lattice_bytes()).decode("ascii")
+        return state
+
+
+class BatchedIsingModel2D:
+    # R независимых решеток с одинаковыми параметрами в одном массиве (R, N, N):
+    # накладные расходы Python делятся на все реплики
+    def __init__(
+        self,
+        replicas: int = 8,
+        size: int = 30,
+        T: float = 1.0,
+        J: float = 1.0,
+        B: float = 0.0,
+        seed: SeedLike = None,
+    ):
+        self.replicas = replicas
+        self.size = size
+        self.T = T
+        self.J = J
+        self.B = B
+        self.kB = 1.0
+        self.rng = np.random.default_rng(seed)
+        self.spins = self.rng.choice(np.array([-1, 1], dtype=np.int8), size=(replicas, size, size))
+        self._table_key = None
+        self._recompute_totals()
+
+    def _recompute_totals(self):
+        s = self.spins
+        self._M = np.sum(s, axis=(1, 2), dtype=np.int64)
+        self._bonds = np.sum(s * np.roll(s, -1, axis=2), axis=(1, 2), dtype=np.int64) + np.sum(
+            s * np.roll(s, -1, axis=1), axis=(1, 2), dtype=np.int64
+        )
+
+    def _update_acceptance_table(self):
+        key = (self.T, self.J, self.B, self.kB)
+        if self._table_key != key:
+            self._table = acceptance_table(self.T, self.J, self.B, self.kB)
+            self._table_key = key
+
+    def neighbor_sum(self) -> np.ndarray:
+        s = self.spins
+        return (
+            np.roll(s, 1, axis=1)
+            + np.roll(s, -1, axis=1)
+            + np.roll(s, 1, axis=2)
+            + np.roll(s, -1, axis=2)
+        )
+
+    def metropolis_step(self) -> int:
+        # один случайный узел в каждой реплике за вызов
+        N = self.size
+        self._update_acceptance_table()
+        r = np.arange(self.replicas)
+        i = self.rng.integers(0, N, self.replicas)
+        j = self.rng.integers(0, N, self.replicas)
+
+        s = self.spins[r, i, j].astype(np.int64)
+        nb = (
+            self.spins[r, (i + 1) % N, j]
+            + self.spins[r, (i - 1) % N, j]
+            + self.spins[r, i, (j + 1) % N]
+            + self.spins[r, i, (j - 1) % N]
+        ).astype(np.int64)
+        p = self._table[(s + 1) // 2, (nb + 4) // 2]
+        flip = self.rng.random(self.replicas) < p
+
+        self.spins[r[flip], i[flip], j[flip]] *= -1
+        self._M -= 2 * s * flip
+        self._bonds -= 2 * s * nb * flip
+        return int(np.count_nonzero(flip))
+
+    def sweep(self) -> int:
+        self._update_acceptance_table()
+        accepted = 0
+        for mask in _sublattice_masks(self.size):
+            nb = self.neighbor_sum()
+            prob = self._table[(self.spins + 1) // 2, (nb + 4) // 2]
+            flip = mask & (self.rng.random(self.spins.shape) < prob)
+            flipped = np.where(flip, self.spins, 0)
+            self._M -= 2 * np.sum(flipped, axis=(1, 2), dtype=np.int64)
+            self._bonds -= 2 * np.sum(flipped * nb, axis=(1, 2), dtype=np.int64)
+            self.spins[flip] *= -1
+            accepted += int(np.count_nonzero(flip))
+        return accepted
+
+    def update(self, algorithm: str = "metropolis") -> int:
+        if algorithm == "metropolis":
+            return self.metropolis_step()
+        if algorithm == "checkerboard":
+            return self.sweep()
+        raise ValueError(f"Algorithm {algorithm} is not supported for batched lattices")
 
-_models: Dict[str, IsingModel2D] = {}
+    def total_magnetizations(self) -> np.ndarray:
+        return self._M.copy()
 
+    def energies(self) -> np.ndarray:
+        return -self.J * self._bonds - self.B * self._M
 
-def get_model(session_id: str) -> IsingModel2D:
-    if session_id not in _models:
-        _models[session_id] = IsingModel2D()
-    return _models[session_id]
 
+def _measure_temperature(
+    T: float,
+    seed: SeedLike,
+    size: int,
+    J: float,
+    B: float,
+    equilibration_steps: int,
+    measurement_steps: int,
+    algorithm: str,
+    replicas: int = 1,
+    histogram: bool = False,
+    auto_sampling: bool = False,
+    effective_samples: int = 100,
+    checkpoint: Optional[str] = None,
+    checkpoint_interval: float = 60.0,
+) -> Dict:
+    # histogram=True добавляет к точке гистограмму (E, M) для перевзвешивания;
+    # checkpoint — файл, куда раз в checkpoint_interval секунд сохраняется
+    # незаконченное измерение (только для одной решетки без auto_sampling)
+    if auto_sampling:
+        return _measure_temperature_auto(
+            T, seed, size, J, B, equilibration_steps, measurement_steps, algorithm,
+            replicas, histogram, effective_samples,
+        )
+    if replicas > 1:
+        return _measure_temperature_batched(
+            T, seed, size, J, B, equilibration_steps, measurement_steps, algorithm, replicas, histogram
+        )
+
+    N_total = size * size
+    total_steps = equilibration_steps + measurement_steps
+    magnetizations = np.empty(measurement_steps)
+    energies = np.empty(measurement_steps)
+    done = 0
+    header = None
+    if checkpoint:
+        try:
+            header, arrays = load_checkpoint(checkpoint, mmap=False)
+        except (FileNotFoundError, ValueError):
+            pass
+    if header is not None:
+        model = IsingModel2D.from_buffer(header["model"], arrays["lattice"])
+        done = header["done"]
+        measured = max(0, done - equilibration_steps)
+        magnetizations[:measured] = arrays["magnetizations"]
+        energies[:measured] = arrays["energies"]
+    else:
+        model = IsingModel2D(size=size, T=T, J=J, B=B, seed=seed)
+
+    # Обновления идут блоками фиксированной длины, поэтому продолженное
+    # из контрольной точки измерение совпадает с непрерывным
+    last_save = time.monotonic()
+    while done < total_steps:
+        n_updates = min(MEASUREMENT_BLOCK, total_steps - done)
+        block_M, block_E = _sample_series(model, algorithm, n_updates)
+        # часть блока, попавшая в фазу измерений
+        skip = min(n_updates, max(0, equilibration_steps - done))
+        start = max(0, done - equilibration_steps)
+        magnetizations[start : start + n_updates - skip] = block_M[skip:]
+        energies[start : start + n_updates - skip] = block_E[skip:]
+        done += n_updates
+
+        if checkpoint and done < total_steps and time.monotonic() - last_save >= checkpoint_interval:
+            measured = max(0, done - equilibration_steps)
+            save_checkpoint(
+                checkpoint,
+                {"model": model.export_state(), "done": done},
+                {
+                    "lattice": model.lattice_buffer,
+                    "magnetizations": magnetizations[:measured],
+                    "energies": energies[:measured],
+                },
+            )
+            last_save = time.monotonic()
+
+    point = temperature_observables(T, magnetizations, energies, N_total)
+    if histogram:
+        point["histogram"] = energy_histogram(magnetizations, energies)
+    return point
+
+
+def _measure_temperature_batched(
+    T: float,
+    seed: SeedLike,
+    size: int,
+    J: float,
+    B: float,
+    equilibration_steps: int,
+    measurement_steps: int,
+    algorithm: str,
+    replicas: int,
+    histogram: bool = False,
+) -> Dict:
+    model = BatchedIsingModel2D(replicas=replicas, size=size, T=T, J=J, B=B, seed=seed)
+
+    for _ in range(equilibration_steps):
+        model.update(algorithm)
+
+    magnetizations = np.empty((measurement_steps, replicas))
+    energies = np.empty((measurement_steps, replicas))
+
+    for k in range(measurement_steps):
+        model.update(algorithm)
+        magnetizations[k] = model.total_magnetizations()
+        energies[k] = model.energies()
+
+    # наблюдаемые считаются по каждой реплике и усредняются по репликам
+    per_replica = [
+        temperature_observables(T, magnetizations[:, r], energies[:, r], size * size)
+        for r in range(replicas)
+    ]
+    point = {
+        key: float(np.mean([point[key] for point in per_replica]))
+        for key in per_replica[0]
+    }
+    if histogram:
+        # реплики — независимые выборки одного распределения, гистограмма общая
+        point["histogram"] = energy_histogram(magnetizations, energies)
+    return point
+
+
+# Длина блока обновлений при измерении одной решетки: между блоками
+# проверяется, не пора ли сохранить контрольную точку
+MEASUREMENT_BLOCK = 1000
+
+# Во сколько раз автоматический режим может превысить начальный бюджет
+# equilibration_steps + measurement_steps, набирая независимые выборки
+AUTO_MAX_FACTOR = 8
+
+OBSERVABLES = ("M_abs_avg", "M_std", "susceptibility", "energy_avg")
+
+
+def _sample_series(model, algorithm: str, n_updates: int) -> Tuple[np.ndarray, np.ndarray]:
+    # M и E после каждого из n_updates обновлений; для BatchedIsingModel2D —
+    # массивы (n_updates, replicas)
+    if isinstance(model, IsingModel2D) and algorithm == "metropolis":
+        _, magnetizations, bonds = model.run_metropolis(n_updates, trace=True)
+        return magnetizations, -model.J * bonds - model.B * magnetizations
+
+    if isinstance(model, BatchedIsingModel2D):
+        magnetizations = np.empty((n_updates, model.replicas))
+        energies = np.empty((n_updates, model.replicas))
+        for k in range(n_updates):
+            model.update(algorithm)
+            magnetizations[k] = model.total_magnetizations()
+            energies[k] = model.energies()
+        return magnetizations, energies
+
+    magnetizations = np.empty(n_updates)
+    energies = np.empty(n_updates)
+    for k in range(n_updates):
+        model.update(algorithm)
+        magnetizations[k] = model.total_magnetization()
+        energies[k] = model.calculate_energy()
+    return magnetizations, energies
+
+
+def _measure_temperature_auto(
+    T: float,
+    seed: SeedLike,
+    size: int,
+    J: float,
+    B: float,
+    equilibration_steps: int,
+    measurement_steps: int,
+    algorithm: str,
+    replicas: int,
+    histogram: bool,
+    effective_samples: int,
+) -> Dict:
+    # Ряд пишется с первого обновления. Начало равновесия и τ_int определяются
+    # по самому ряду; он продлевается, пока не наберётся effective_samples
+    # независимых выборок или AUTO_MAX_FACTOR начальных бюджетов. Наблюдаемые
+    # считаются по прореженному ряду, ошибки — блочным jackknife.
+    N_total = size * size
+    if replicas > 1:
+        model = BatchedIsingModel2D(replicas=replicas, size=size, T=T, J=J, B=B, seed=seed)
+    else:
+        model = IsingModel2D(size=size, T=T, J=J, B=B, seed=seed)
+
+    budget = equilibration_steps + measurement_steps
+    chunks = [_sample_series(model, algorithm, budget)]
+    while True:
+        magnetizations = np.concatenate([chunk[0] for chunk in chunks])
+        energies = np.concatenate([chunk[1] for chunk in chunks])
+        # нормированная автокорреляция среднего по независимым репликам та же,
+        # что у одной реплики, поэтому анализируется средний ряд
+        mean_abs_M = np.abs(magnetizations).reshape(len(magnetizations), -1).mean(axis=1)
+        mean_E = energies.reshape(len(energies), -1).mean(axis=1)
+
+        t0, tau_E, _ = mc_statistics.detect_equilibration(mean_E)
+        tau = max(tau_E, mc_statistics.integrated_autocorrelation_time(mean_abs_M[t0:]))
+        n_effective = (len(mean_E) - t0) * replicas / (2 * tau)
+        if n_effective >= effective_samples or len(mean_E) >= AUTO_MAX_FACTOR * budget:
+            break
+        chunks.append(_sample_series(model, algorithm, budget))
+
+    stride = mc_statistics.thinning_stride(tau, len(mean_E) - t0)
+    magnetizations = magnetizations[t0::stride]
+    energies = energies[t0::stride]
+
+    def estimate(mags: np.ndarray, ens: np.ndarray) -> List[float]:
+        # реплики — столбцы, наблюдаемые считаются по каждой и усредняются
+        mags = mags.reshape(len(mags), -1)
+        ens = ens.reshape(len(ens), -1)
+        per_replica = [
+            temperature_observables(T, mags[:, r], ens[:, r], N_total) for r in range(mags.shape[1])
+        ]
+        return [np.mean([point[key] for point in per_replica]) for key in OBSERVABLES]
+
+    values, errors = mc_statistics.jackknife((magnetizations, energies), estimate)
+
+    point = {"temperature": float(T)}
+    for key, value, error in zip(OBSERVABLES, values, errors):
+        point[key] = float(value)
+        point[key + "_err"] = float(error)
+    point.update(
+        tau_int=float(tau),
+        equilibration_steps=int(t0),
+        samples=int(len(energies) * replicas),
+        steps=int(sum(len(chunk[0]) for chunk in chunks)),
+    )
+    if histogram:
+        point["histogram"] = energy_histogram(magnetizations, energies)
+    return point
+
+
+def temperature_observables(
+    T: float, magnetizations: List[float], energies: List[float], N_total: int
+) -> Dict:
+    magnetizations = np.asarray(magnetizations, dtype=float)
+
+    # Кластерные алгоритмы свободно меняют знак M в упорядоченной фазе,
+    # поэтому флуктуации считаем по |M|: χ = (⟨M²⟩ - ⟨|M|⟩²) / (T·N)
+    M_abs_avg = np.mean(np.abs(magnetizations))  # ⟨|M|⟩
+    M_std = np.std(np.abs(magnetizations))
+
+    M_squared_avg = np.mean(magnetizations**2)
+    chi = (M_squared_avg - M_abs_avg**2) / (T * N_total) if T > 0 else 0
+
+    E_avg = np.mean(energies)
+
+    return {
+        "temperature": float(T),
+        "M_abs_avg": float(M_abs_avg / N_total),  # Нормируем
+        "M_std": float(M_std / N_total),
+        "susceptibility": float(chi),
+        "energy_avg": float(E_avg / N_total),
+    }
+
+
+def _measure_points(
+    temperatures: np.ndarray,
+    seeds: List[np.random.SeedSequence],
+    measure: Callable[..., Dict],
+    n_workers: Optional[int],
+    on_point: Optional[Callable[[Dict], None]],
+    should_stop: Optional[Callable[[], bool]],
+    checkpoint: Optional[ScanCheckpoint] = None,
+    point_ids: Optional[List[str]] = None,
+) -> List[Dict]:
+    # Точки, уже записанные в checkpoint, не пересчитываются; остальные
+    # получают свой файл для незаконченного измерения
+    n_points = len(temperatures)
+    if point_ids is None:
+        point_ids = [str(k) for k in range(n_points)]
+
+    points: List[Optional[Dict]] = [None] * n_points
+
+    def finish(k: int, point: Dict):
+        points[k] = point
+        if checkpoint is not None:
+            checkpoint.record(point_ids[k], point)
+        if on_point is not None:
+            on_point(point)
+
+    pending_points = []
+    for k in range(n_points):
+        saved = checkpoint.get(point_ids[k]) if checkpoint is not None else None
+        if saved is not None:
+            points[k] = saved
+            if on_point is not None:
+                on_point(saved)
+        else:
+            pending_points.append(k)
+
+    def task(k: int) -> Tuple:
+        if checkpoint is None:
+            return (measure, temperatures[k], seeds[k])
+        return (
+            partial(
+                measure,
+                checkpoint=checkpoint.point_path(point_ids[k]),
+                checkpoint_interval=checkpoint.interval,
+            ),
+            temperatures[k],
+            seeds[k],
+        )
+
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    n_workers = max(1, min(n_workers, len(pending_points)))
+
+    if n_workers == 1:
+        for k in pending_points:
+            if should_stop is not None and should_stop():
+                raise ScanCancelled()
+            func, T, point_seed = task(k)
+            finish(k, func(T, point_seed))
+    else:
+        # без with: его __exit__ ждал бы идущие точки, и отменённая задача
+        # оставалась бы "running" до их окончания
+        pool = ProcessPoolExecutor(max_workers=n_workers)
+        try:
+            pending = {pool.submit(*task(k)): k for k in pending_points}
+            while pending:
+                done, _ = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                if should_stop is not None and should_stop():
+                    raise ScanCancelled()
+                for future in done:
+                    finish(pending.pop(future), future.result())
+        except BaseException:
+            _terminate_pool(pool)
+            raise
+        pool.shutdown()
+
+    return points
+
+
+def _terminate_pool(pool: ProcessPoolExecutor):
+    # Незаконченные точки останавливаются сразу; их промежуточное
+    # состояние остаётся в файлах контрольной точки
+    processes = list((pool._processes or {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.join()
 
-def cleanup_old_sessions():
-    if len(_models) > 100:
-        keys = list(_models.keys())
-        for key in keys[: len(keys) // 2]:
-            del _models[key]
 
 def scan_temperature_ferromagnetic(
     size: int = 20,
@@ -109,53 +922,161 @@ def scan_temperature_ferromagnetic(
     T_steps: int = 25,
     equilibration_steps: int = 2000,
     measurement_steps: int = 1000,
+    algorithm: str = "metropolis",
+    seed: Optional[int] = None,
+    n_workers: Optional[int] = None,
+    on_point: Optional[Callable[[Dict], None]] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+    replicas: int = 1,
+    reweight_points: int = 0,
+    auto_sampling: bool = False,
+    effective_samples: int = 100,
+    checkpoint_path: Optional[str] = None,
+    checkpoint_interval: float = 60.0,
 ) -> Dict:
+    # checkpoint_path: файл контрольной точки; повторный запуск с теми же
+    # параметрами продолжает сканирование с сохранённого места.
+    # reweight_points > 0: по гистограммам всех точек дополнительно строятся
+    # наблюдаемые (и теплоёмкость) на плотной сетке из reweight_points температур
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"Unknown algorithm: {algorithm}")
+    if replicas > 1 and algorithm not in BATCHED_ALGORITHMS:
+        raise ValueError(f"Algorithm {algorithm} is not supported for replicas > 1")
 
     temperatures = np.linspace(T_min, T_max, T_steps)
-    N_total = size * size
+    # Независимый поток случайных чисел на каждую температуру: результат
+    # не зависит от числа процессов и порядка их завершения
+    seeds = np.random.SeedSequence(seed).spawn(T_steps)
 
-    results = {
-        "temperatures": [],
-        "M_abs_avg": [],
-        "M_std": [],
-        "susceptibility": [],
-        "energy_avg": [],
-    }
+    measure = partial(
+        _measure_temperature,
+        size=size,
+        J=J,
+        B=B,
+        equilibration_steps=equilibration_steps,
+        measurement_steps=measurement_steps,
+        algorithm=algorithm,
+        replicas=replicas,
+        histogram=reweight_points > 0,
+        auto_sampling=auto_sampling,
+        effective_samples=effective_samples,
+    )
 
-    for T in temperatures:
-        model = IsingModel2D(size=size, T=T, J=J, B=B)
+    checkpoint = None
+    if checkpoint_path is not None:
+        params = dict(
+            size=size, J=J, B=B, T_min=T_min, T_max=T_max, T_steps=T_steps,
+            equilibration_steps=equilibration_steps, measurement_steps=measurement_steps,
+            algorithm=algorithm, seed=seed, replicas=replicas, reweight_points=reweight_points,
+            auto_sampling=auto_sampling, effective_samples=effective_samples,
+        )
+        checkpoint = ScanCheckpoint(checkpoint_path, params, checkpoint_interval)
 
-        for _ in range(equilibration_steps):
-            model.metropolis_step()
+    points = _measure_points(
+        temperatures, seeds, measure, n_workers, on_point, should_stop, checkpoint
+    )
+    results = collect_scan_results(points)
+    if reweight_points > 0:
+        results["reweighted"] = reweight_scan(points, T_min, T_max, reweight_points, size * size)
+    if checkpoint is not None:
+        checkpoint.remove()
+    return results
 
-        magnetizations = []
-        energies = []
 
-        for _ in range(measurement_steps):
-            model.metropolis_step()
-            M = np.sum(model.spins)
-            E = model.calculate_energy()
-            magnetizations.append(M)
-            energies.append(E)
+def collect_scan_results(points: List[Dict]) -> Dict:
+    # Поля точек собираются в списки по температурам; кроме основных
+    # наблюдаемых это ошибки и диагностика автоматического режима
+    results = {"temperatures": [point["temperature"] for point in points]}
+    for key in points[0]:
+        if key not in ("temperature", "histogram"):
+            results[key] = [point[key] for point in points]
 
-        magnetizations = np.array(magnetizations)
+    return results
 
-        M_abs_avg = np.mean(np.abs(magnetizations))  # ⟨|M|⟩
-        M_std = np.std(magnetizations)
 
-        M_avg = np.mean(magnetizations)
-        M_squared_avg = np.mean(magnetizations**2)
-        chi = (M_squared_avg - M_avg**2) / (T * N_total) if T > 0 else 0
+_CRITICAL_SCAN_STEPS = {
+    "metropolis": (8000, 4000),
+    "checkerboard": (1000, 2000),
+    "wolff": (500, 2000),
+    "swendsen_wang": (200, 1000),
+}
 
-        E_avg = np.mean(energies)
 
-        results["temperatures"].append(float(T))
-        results["M_abs_avg"].append(float(M_abs_avg / N_total))  # Нормируем
-        results["M_std"].append(float(M_std / N_total))
-        results["susceptibility"].append(float(chi))
-        results["energy_avg"].append(float(E_avg / N_total))
+def _chi_peak(temperatures: np.ndarray, chi_values: np.ndarray) -> Tuple[float, float, float, float]:
+    # Максимум χ по параболе через argmax и двух его соседей.
+    # Возвращает (T_peak, χ_peak, T_lo, T_hi), где [T_lo, T_hi] — соседние
+    # измеренные температуры, между которыми лежит максимум
+    k = int(np.argmax(chi_values))
+    lo = max(k - 1, 0)
+    hi = min(k + 1, len(temperatures) - 1)
+    T_peak, chi_peak = float(temperatures[k]), float(chi_values[k])
 
-    return results
+    if 0 < k < len(temperatures) - 1:
+        # χ - χₖ = a·u² + b·u, u = T - Tₖ: так система не вырождается,
+        # когда после нескольких раундов точки стоят очень плотно
+        h_lo, h_hi = temperatures[lo] - T_peak, temperatures[hi] - T_peak
+        d_lo, d_hi = chi_values[lo] - chi_peak, chi_values[hi] - chi_peak
+        a = (d_hi / h_hi - d_lo / h_lo) / (h_hi - h_lo)
+        b = d_lo / h_lo - a * h_lo
+        if a < 0 and h_lo <= -b / (2 * a) <= h_hi:
+            u = -b / (2 * a)
+            T_peak += float(u)
+            chi_peak += float(a * u * u + b * u)
+
+    return T_peak, chi_peak, float(temperatures[lo]), float(temperatures[hi])
+
+
+def _reweighted_chi_peak(points: List[Dict], T_lo: float, T_hi: float, N_total: int) -> Tuple[float, float]:
+    curve = multiple_histogram(points, np.linspace(T_lo, T_hi, 101), N_total)
+    k = int(np.argmax(curve["susceptibility"]))
+    return curve["temperatures"][k], curve["susceptibility"][k]
+
+
+def _adaptive_critical_scan(
+    measure: Callable[[float, np.random.SeedSequence], Dict],
+    T_min: float,
+    T_max: float,
+    points_per_round: int,
+    tolerance: float,
+    max_rounds: int,
+    seed: Optional[int],
+    n_workers: Optional[int],
+    on_point: Optional[Callable[[Dict], None]],
+    should_stop: Optional[Callable[[], bool]],
+    N_total: int = 0,
+    checkpoint: Optional[ScanCheckpoint] = None,
+) -> Tuple[List[Dict], float, float, float, int]:
+    # Грубая сетка по всему интервалу, затем каждый раунд кладёт новые точки
+    # между соседями текущего максимума χ, пока интервал вокруг пика не станет
+    # уже tolerance. Возвращает (точки, T_peak, χ_peak, точность, раунды).
+    # Если точки несут гистограммы, положение пика внутри интервала берётся
+    # из перевзвешивания по всем точкам интервала, а не из параболы
+    round_seeds = np.random.SeedSequence(seed).spawn(max_rounds)
+    points: List[Dict] = []
+    temperatures = np.linspace(T_min, T_max, points_per_round)
+
+    for n_round in range(1, max_rounds + 1):
+        seeds = round_seeds[n_round - 1].spawn(len(temperatures))
+        point_ids = [f"{n_round}-{k}" for k in range(len(temperatures))]
+        points += _measure_points(
+            temperatures, seeds, measure, n_workers, on_point, should_stop, checkpoint, point_ids
+        )
+        points.sort(key=lambda point: point["temperature"])
+
+        T_values = np.array([point["temperature"] for point in points])
+        chi_values = np.array([point["susceptibility"] for point in points])
+        T_peak, chi_peak, T_lo, T_hi = _chi_peak(T_values, chi_values)
+        if "histogram" in points[0]:
+            T_peak, chi_peak = _reweighted_chi_peak(
+                [point for point in points if T_lo <= point["temperature"] <= T_hi], T_lo, T_hi, N_total
+            )
+        precision = max(T_peak - T_lo, T_hi - T_peak)
+        if precision <= tolerance or n_round == max_rounds:
+            break
+
+        temperatures = np.linspace(T_lo, T_hi, points_per_round + 2)[1:-1]
+
+    return points, T_peak, chi_peak, precision, n_round
 
 
 def find_critical_temperature(
@@ -164,30 +1085,110 @@ def find_critical_temperature(
     T_min: float = 1.8,
     T_max: float = 2.8,
     T_steps: int = 40,
+    algorithm: str = "metropolis",
+    seed: Optional[int] = None,
+    n_workers: Optional[int] = None,
+    on_point: Optional[Callable[[Dict], None]] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+    replicas: int = 1,
+    adaptive: bool = False,
+    points_per_round: int = 8,
+    tolerance: float = 0.01,
+    max_rounds: int = 5,
+    reweight: bool = False,
+    checkpoint_path: Optional[str] = None,
+    checkpoint_interval: float = 60.0,
 ) -> Dict:
-    result = scan_temperature_ferromagnetic(
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"Unknown algorithm: {algorithm}")
+    if replicas > 1 and algorithm not in BATCHED_ALGORITHMS:
+        raise ValueError(f"Algorithm {algorithm} is not supported for replicas > 1")
+
+    # Кластерные алгоритмы дают почти независимые конфигурации за одно обновление,
+    # поэтому им нужно на порядки меньше шагов, чем одиночному Метрополису
+    equilibration_steps, measurement_steps = _CRITICAL_SCAN_STEPS[algorithm]
+    T_c_theory = 2.269 * J
+
+    if not adaptive:
+        result = scan_temperature_ferromagnetic(
+            size=size,
+            J=J,
+            B=0.0,
+            T_min=T_min,
+            T_max=T_max,
+            T_steps=T_steps,
+            equilibration_steps=equilibration_steps,
+            measurement_steps=measurement_steps,
+            algorithm=algorithm,
+            seed=seed,
+            n_workers=n_workers,
+            on_point=on_point,
+            should_stop=should_stop,
+            replicas=replicas,
+            # с reweight χ перевзвешивается на сетке в 10 раз плотнее измеренной
+            reweight_points=10 * (T_steps - 1) + 1 if reweight else 0,
+            checkpoint_path=checkpoint_path,
+            checkpoint_interval=checkpoint_interval,
+        )
+
+        chi_values = np.array(result["susceptibility"])
+        T_values = np.array(result["temperatures"])
+
+        idx_max_chi = np.argmax(chi_values)
+        T_c_exp = T_values[idx_max_chi]
+        chi_max = chi_values[idx_max_chi]
+        if reweight:
+            # максимум перевзвешенной χ между соседями измеренного максимума,
+            # как в адаптивном режиме: вдали от пика перевзвешивание не нужно
+            _, _, T_lo, T_hi = _chi_peak(T_values, chi_values)
+            curve_T = np.array(result["reweighted"]["temperatures"])
+            curve_chi = np.array(result["reweighted"]["susceptibility"])
+            window = (curve_T >= T_lo) & (curve_T <= T_hi)
+            k = int(np.argmax(np.where(window, curve_chi, -np.inf)))
+            T_c_exp, chi_max = curve_T[k], curve_chi[k]
+
+        return {
+            "T_c_experimental": float(T_c_exp),
+            "chi_max": float(chi_max),
+            "T_c_theoretical": float(T_c_theory),
+            "error_percent": float(abs(T_c_exp - T_c_theory) / T_c_theory * 100),
+            "scan_result": result,
+        }
+
+    measure = partial(
+        _measure_temperature,
         size=size,
         J=J,
         B=0.0,
-        T_min=T_min,
-        T_max=T_max,
-        T_steps=T_steps,
-        equilibration_steps=8000,
-        measurement_steps=4000,
+        equilibration_steps=equilibration_steps,
+        measurement_steps=measurement_steps,
+        algorithm=algorithm,
+        replicas=replicas,
+        histogram=reweight,
     )
+    checkpoint = None
+    if checkpoint_path is not None:
+        params = dict(
+            size=size, J=J, T_min=T_min, T_max=T_max, algorithm=algorithm, seed=seed,
+            replicas=replicas, points_per_round=points_per_round, tolerance=tolerance,
+            max_rounds=max_rounds, reweight=reweight,
+        )
+        checkpoint = ScanCheckpoint(checkpoint_path, params, checkpoint_interval)
 
-    chi_values = np.array(result["susceptibility"])
-    T_values = np.array(result["temperatures"])
-
-    idx_max_chi = np.argmax(chi_values)
-    T_c_exp = T_values[idx_max_chi]
-    chi_max = chi_values[idx_max_chi]
-    T_c_theory = 2.269 * J
+    points, T_c_exp, chi_max, precision, rounds = _adaptive_critical_scan(
+        measure, T_min, T_max, points_per_round, tolerance, max_rounds,
+        seed, n_workers, on_point, should_stop, size * size, checkpoint,
+    )
+    if checkpoint is not None:
+        checkpoint.remove()
 
     return {
         "T_c_experimental": float(T_c_exp),
         "chi_max": float(chi_max),
         "T_c_theoretical": float(T_c_theory),
         "error_percent": float(abs(T_c_exp - T_c_theory) / T_c_theory * 100),
-        "scan_result": result,
+        "precision": float(precision),
+        "rounds": rounds,
+        "monte_carlo_steps": len(points) * (equilibration_steps + measurement_steps) * replicas,
+        "scan_result": collect_scan_results(points),
     }
@@ -0,0 +1,137 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from ising_model import ScanCancelled
+
+JOB_STATUSES = ("queued", "running", "done", "failed", "cancelled")
+
+
+class Job:
+    def __init__(self, kind: str, params: Dict[str, Any], total: int):
+        self.id = str(uuid.uuid4())
+        self.kind = kind
+        self.params = params
+        self.total = total
+        self.status = "queued"
+        self.completed: List[float] = []
+        # пошаговый прогресс для задач, у которых точки готовы только в конце
+        self.steps_done = 0
+        self.steps_total: Optional[int] = None
+        self.result: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.future: Optional[Future] = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed", "cancelled")
+
+    def on_point(self, point: Dict):
+        with self._lock:
+            self.completed.append(point["temperature"])
+
+    def on_progress(self, done: int, total: int):
+        with self._lock:
+            self.steps_done = done
+            self.steps_total = total
+
+    def should_stop(self) -> bool:
+        return self._cancel.is_set()
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            completed = sorted(self.completed)
+            steps_done, steps_total = self.steps_done, self.steps_total
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "params": self.params,
+            "progress": {
+                "completed": len(completed),
+                "total": self.total,
+                "temperatures_done": completed,
+                "steps_done": steps_done,
+                "steps_total": steps_total,
+            },
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobManager:
+    def __init__(self, max_workers: int = 1, max_finished: int = 100):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ising-job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_finished = max_finished
+
+    def submit(
+        self,
+        kind: str,
+        func: Callable[..., Dict],
+        params: Dict[str, Any],
+        total: int,
+        progress: bool = False,
+        **kwargs,
+    ) -> Job:
+        # progress=True — func принимает on_progress(done, total) для пошагового прогресса
+        job = Job(kind, params, total)
+        if progress:
+            kwargs["on_progress"] = job.on_progress
+        with self._lock:
+            self._jobs[job.id] = job
+            self._evict_finished()
+        job.future = self._executor.submit(self._run, job, func, {**params, **kwargs})
+        return job
+
+    def _run(self, job: Job, func: Callable[..., Dict], kwargs: Dict[str, Any]):
+        if job.should_stop():
+            job.status = "cancelled"
+            job.finished_at = time.time()
+            return
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            job.result = func(**kwargs, on_point=job.on_point, should_stop=job.should_stop)
+            job.status = "done"
+        except ScanCancelled:
+            job.status = "cancelled"
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+
+    def _evict_finished(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[: max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Job:
+        with self._lock:
+            return self._jobs[job_id]
+
+    def cancel(self, job_id: str) -> Job:
+        job = self.get(job_id)
+        if not job.finished:
+            job._cancel.set()
+            if job.future is not None and job.future.cancel():
+                job.status = "cancelled"
+                job.finished_at = time.time()
+        return job
+
+    def list_jobs(self) -> List[Dict]:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job.to_dict() for job in jobs]
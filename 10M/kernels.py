@@ -0,0 +1,114 @@
+from typing import Tuple
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:  # numba — необязательная зависимость
+    numba = None
+
+KERNEL_BACKENDS = ("auto", "numba", "python")
+HAVE_NUMBA = numba is not None
+
+# случайные узлы и числа вытягиваются порциями, чтобы не держать в памяти
+# массивы на все n шагов сразу
+CHUNK_STEPS = 1 << 16
+
+
+def _metropolis_loop(spins, table, rows, cols, uniforms, M, bonds, m_trace, bond_trace):
+    # Последовательный Metropolis по случайным узлам — та же динамика, что и
+    # IsingModel2D.metropolis_step. Узлы и случайные числа вытянуты заранее;
+    # если m_trace непуст, после каждого шага в него пишутся M и bonds.
+    N = spins.shape[0]
+    accepted = 0
+    record = m_trace.shape[0] > 0
+    for k in range(rows.shape[0]):
+        i = rows[k]
+        j = cols[k]
+        # int(): сумма соседей и приращения не должны считаться в int8
+        s = int(spins[i, j])
+        nb = (
+            int(spins[(i + 1) % N, j])
+            + int(spins[(i - 1) % N, j])
+            + int(spins[i, (j + 1) % N])
+            + int(spins[i, (j - 1) % N])
+        )
+        p = table[(s + 1) // 2, (nb + 4) // 2]
+        if p >= 1.0 or uniforms[k] < p:
+            spins[i, j] = -s
+            M -= 2 * s
+            bonds -= 2 * s * nb
+            accepted += 1
+        if record:
+            m_trace[k] = M
+            bond_trace[k] = bonds
+    return accepted, M, bonds
+
+
+def _metropolis_python(spins, table, rows, cols, uniforms, M, bonds, m_trace, bond_trace):
+    # Запасной вариант без numba: тот же цикл на списках Python — индексация
+    # списков в интерпретаторе в разы быстрее поэлементного доступа к ndarray
+    lattice = spins.tolist()
+    rows_table = table.tolist()
+    N = len(lattice)
+    accepted = 0
+    record = len(m_trace) > 0
+    for k, (i, j, u) in enumerate(zip(rows.tolist(), cols.tolist(), uniforms.tolist())):
+        row = lattice[i]
+        s = row[j]
+        nb = lattice[(i + 1) % N][j] + lattice[i - 1][j] + row[(j + 1) % N] + row[j - 1]
+        p = rows_table[(s + 1) // 2][(nb + 4) // 2]
+        if p >= 1.0 or u < p:
+            row[j] = -s
+            M -= 2 * s
+            bonds -= 2 * s * nb
+            accepted += 1
+        if record:
+            m_trace[k] = M
+            bond_trace[k] = bonds
+    spins[...] = lattice
+    return accepted, M, bonds
+
+
+_metropolis_numba = numba.njit(cache=True, nogil=True)(_metropolis_loop) if HAVE_NUMBA else None
+
+
+def resolve_backend(backend: str) -> str:
+    if backend not in KERNEL_BACKENDS:
+        raise ValueError(f"Unknown kernel backend: {backend}")
+    if backend == "auto":
+        return "numba" if HAVE_NUMBA else "python"
+    if backend == "numba" and not HAVE_NUMBA:
+        raise ValueError("numba is not installed")
+    return backend
+
+
+def run_metropolis(
+    spins: np.ndarray,
+    table: np.ndarray,
+    rng: np.random.Generator,
+    n_steps: int,
+    M: int,
+    bonds: int,
+    backend: str = "auto",
+    trace: bool = False,
+) -> Tuple[int, int, int, np.ndarray, np.ndarray]:
+    # Возвращает (accepted, M, bonds, m_trace, bond_trace); решетка spins
+    # (int8, N×N) меняется на месте. Без trace массивы трасс пустые.
+    kernel = _metropolis_numba if resolve_backend(backend) == "numba" else _metropolis_python
+    size = spins.shape[0]
+    m_trace = np.empty(n_steps if trace else 0, dtype=np.int64)
+    bond_trace = np.empty(n_steps if trace else 0, dtype=np.int64)
+    accepted = 0
+    for start in range(0, n_steps, CHUNK_STEPS):
+        stop = min(n_steps, start + CHUNK_STEPS)
+        n = stop - start
+        rows = rng.integers(0, size, n)
+        cols = rng.integers(0, size, n)
+        uniforms = rng.random(n)
+        chunk_accepted, M, bonds = kernel(
+            spins, table, rows, cols, uniforms, M, bonds,
+            m_trace[start:stop], bond_trace[start:stop],
+        )
+        accepted += int(chunk_accepted)
+    return accepted, int(M), int(bonds), m_trace, bond_trace
@@ -0,0 +1,78 @@
+import math
+from typing import Callable, Sequence, Tuple
+
+import numpy as np
+
+# Статистика коррелированных рядов Монте-Карло: соседние измерения цепочки
+# Маркова почти одинаковы, поэтому число независимых выборок — это
+# n / (2·τ_int), а не n, и ошибки считаются по блокам длиннее τ_int.
+
+
+def autocorrelation(x: np.ndarray) -> np.ndarray:
+    # Нормированная автокорреляция ρ(t) через БПФ (с дополнением нулями
+    # до 2n, чтобы не было циклического заворота)
+    x = np.asarray(x, dtype=float)
+    n = len(x)
+    dx = x - np.mean(x)
+    size = 1 << (2 * n - 1).bit_length()
+    spectrum = np.fft.rfft(dx, size)
+    acf = np.fft.irfft(spectrum * np.conj(spectrum), size)[:n]
+    if acf[0] <= 0:
+        return np.zeros(n)
+    return acf / acf[0]
+
+
+def integrated_autocorrelation_time(x: np.ndarray, window_factor: float = 5.0) -> float:
+    # τ_int = 1/2 + Σ ρ(t) с автоматическим окном Сокала: суммирование
+    # обрывается на первом W ≥ c·τ_int(W), дальше в сумме в основном шум
+    rho = autocorrelation(x)
+    if len(rho) < 2 or rho[0] == 0:
+        return 0.5
+    taus = 0.5 + np.cumsum(rho[1:])
+    windows = np.arange(1, len(rho))
+    stop = np.flatnonzero(windows >= window_factor * taus)
+    tau = taus[stop[0]] if stop.size else taus[-1]
+    return float(max(tau, 0.5))
+
+
+def detect_equilibration(x: np.ndarray, n_candidates: int = 20) -> Tuple[int, float, float]:
+    # Начало равновесного участка — то t0, при котором остаток ряда даёт
+    # больше всего независимых выборок (n - t0) / (2·τ_int) (метод Chodera).
+    # Возвращает (t0, τ_int остатка, число независимых выборок)
+    n = len(x)
+    best = (0, 0.5, 0.0)
+    for t0 in np.unique(np.linspace(0, n // 2, n_candidates).astype(int)):
+        tau = integrated_autocorrelation_time(x[t0:])
+        n_effective = (n - t0) / (2 * tau)
+        if n_effective > best[2]:
+            best = (int(t0), tau, float(n_effective))
+    return best
+
+
+def thinning_stride(tau: float, n: int) -> int:
+    # шаг прореживания до почти независимых выборок, но не меньше двух выборок
+    return max(1, min(math.ceil(2 * tau), n // 2))
+
+
+def jackknife(
+    samples: Sequence[np.ndarray],
+    estimator: Callable[..., np.ndarray],
+    n_blocks: int = 20,
+) -> Tuple[np.ndarray, np.ndarray]:
+    # Блочный jackknife: ряды режутся на n_blocks блоков, оценка повторяется
+    # без каждого блока; работает и для нелинейных величин вроде χ.
+    # Возвращает (значения по всем данным, их стандартные ошибки)
+    n = len(samples[0])
+    value = np.asarray(estimator(*samples), dtype=float)
+    n_blocks = min(n_blocks, n)
+    if n_blocks < 2:
+        return value, np.zeros_like(value)
+
+    edges = np.linspace(0, n, n_blocks + 1).astype(int)
+    estimates = []
+    for start, stop in zip(edges[:-1], edges[1:]):
+        keep = np.r_[0:start, stop:n]
+        estimates.append(estimator(*(np.asarray(series)[keep] for series in samples)))
+    estimates = np.asarray(estimates, dtype=float)
+    error = np.sqrt((n_blocks - 1) * np.mean((estimates - estimates.mean(axis=0)) ** 2, axis=0))
+    return value, error
@@ -0,0 +1,201 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+from ising_model import ALGORITHM_VERSION
+
+# аргументы, которые не влияют на результат и не входят в ключ
+RUNTIME_ARGUMENTS = ("n_workers", "on_point", "should_stop", "checkpoint_path", "checkpoint_interval")
+
+
+def cache_key(kind: str, params: Dict[str, Any]) -> str:
+    # Ключ — хэш всех параметров запроса (включая seed) и версии алгоритмов:
+    # после изменения численной схемы старые результаты просто не находятся
+    payload = {"kind": kind, "version": ALGORITHM_VERSION, "params": params}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _flatten(result: Dict, prefix: str = "") -> Dict[str, np.ndarray]:
+    arrays = {}
+    for name, value in result.items():
+        if isinstance(value, dict):
+            arrays.update(_flatten(value, f"{prefix}{name}."))
+        else:
+            arrays[prefix + name] = np.asarray(value)
+    return arrays
+
+
+def _unflatten(arrays) -> Dict:
+    result: Dict = {}
+    for key in arrays.files:
+        *path, name = key.split(".")
+        node = result
+        for part in path:
+            node = node.setdefault(part, {})
+        value = arrays[key]
+        node[name] = value.item() if value.ndim == 0 else value.tolist()
+    return result
+
+
+class ResultCache:
+    # Два уровня: LRU в памяти процесса на max_entries результатов и каталог
+    # .npz-файлов, общий для всех воркеров, с вытеснением самых давно
+    # прочитанных файлов при превышении max_disk_bytes.
+    SUFFIX = ".npz"
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        max_entries: int = 128,
+        max_disk_bytes: int = 64 * 1024 * 1024,
+    ):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return result
+
+        result = self._read(key)
+        with self._lock:
+            if result is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, result)
+        return result
+
+    def put(self, key: str, result: Dict):
+        with self._lock:
+            self._remember(key, result)
+        self._write(key, result)
+
+    def _remember(self, key: str, result: Dict):
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _read(self, key: str) -> Optional[Dict]:
+        if self.directory is None:
+            return None
+        path = self._path(key)
+        try:
+            with np.load(path) as arrays:
+                result = _unflatten(arrays)
+            # время изменения файла служит отметкой последнего чтения для LRU
+            os.utime(path)
+        except (FileNotFoundError, OSError, ValueError):
+            return None
+        return result
+
+    def _write(self, key: str, result: Dict):
+        if self.directory is None:
+            return
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, **_flatten(result))
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self._evict()
+
+    def _files(self):
+        files = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(self.SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        return sorted(files)
+
+    def _evict(self):
+        files = self._files()
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            with self._lock:
+                self.evictions += 1
+
+    def cached(self, kind: str, func: Callable[..., Dict], reuse: bool) -> Callable[..., Dict]:
+        # Обёртка над функцией сканирования: результат всегда сохраняется,
+        # а берётся из кэша только при reuse (запросы с seed детерминированы)
+        def run(**kwargs) -> Dict:
+            params = {name: value for name, value in kwargs.items() if name not in RUNTIME_ARGUMENTS}
+            key = cache_key(kind, params)
+            if reuse:
+                result = self.get(key)
+                if result is not None:
+                    return result
+            result = func(**kwargs)
+            self.put(key, result)
+            return result
+
+        return run
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = {
+                "entries": len(self._memory),
+                "max_entries": self.max_entries,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+        if self.directory is not None:
+            files = self._files()
+            stats.update(
+                directory=self.directory,
+                disk_entries=len(files),
+                disk_bytes=sum(size for _, size, _ in files),
+                max_disk_bytes=self.max_disk_bytes,
+            )
+        return stats
+
+
+def create_cache() -> ResultCache:
+    # ISING_CACHE_DIR="" отключает дисковый уровень
+    directory = os.environ.get("ISING_CACHE_DIR", os.path.join(tempfile.gettempdir(), "ising_cache"))
+    return ResultCache(
+        directory=directory or None,
+        max_entries=int(os.environ.get("ISING_CACHE_ENTRIES", 128)),
+        max_disk_bytes=int(os.environ.get("ISING_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+    )
+
+
+results = create_cache()
@@ -0,0 +1,160 @@
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+# Гистограммное перевзвешивание (Ferrenberg–Swendsen). Измерение при
+# температуре T₀ сохраняет гистограмму пар (E, M); так как вероятность
+# состояния ∝ g(E, M)·exp(-E/T), по ней можно получить средние при соседних
+# температурах без новой симуляции. Несколько гистограмм при разных T
+# объединяются в одну оценку плотности состояний g(E, M).
+
+
+def energy_histogram(magnetizations: np.ndarray, energies: np.ndarray) -> Dict:
+    # Совместная гистограмма измеренных пар (E, M) в виде списков
+    # для JSON: значения E и M каждой ячейки и число попаданий в неё
+    pairs = np.stack([np.ravel(energies), np.ravel(magnetizations)], axis=1)
+    values, counts = np.unique(pairs, axis=0, return_counts=True)
+    return {
+        "energies": values[:, 0].tolist(),
+        "magnetizations": values[:, 1].tolist(),
+        "counts": counts.tolist(),
+    }
+
+
+def _logsumexp(x: np.ndarray, axis: int) -> np.ndarray:
+    x_max = np.max(x, axis=axis, keepdims=True)
+    return np.squeeze(np.log(np.sum(np.exp(x - x_max), axis=axis, keepdims=True)) + x_max, axis=axis)
+
+
+def _observables(
+    temperatures: np.ndarray, log_g: np.ndarray, E: np.ndarray, M: np.ndarray, N_total: int
+) -> Dict:
+    # Средние по распределению g(E, M)·exp(-E/T) для каждой T из temperatures;
+    # по одной температуре за раз, чтобы не строить матрицу T × состояния
+    M_abs = np.abs(M)
+    moments = np.empty((len(temperatures), 4))
+    for k, T in enumerate(temperatures):
+        log_w = log_g - E / T
+        w = np.exp(log_w - np.max(log_w))
+        w /= np.sum(w)
+        moments[k] = (w @ M_abs, w @ (M * M), w @ E, w @ (E * E))
+    M_abs_avg, M_squared_avg, E_avg, E_squared_avg = moments.T
+
+    chi = (M_squared_avg - M_abs_avg**2) / (temperatures * N_total)
+    heat = (E_squared_avg - E_avg**2) / (temperatures**2 * N_total)
+    return {
+        "temperatures": temperatures.tolist(),
+        "M_abs_avg": (M_abs_avg / N_total).tolist(),
+        "M_std": (np.sqrt(np.maximum(M_squared_avg - M_abs_avg**2, 0.0)) / N_total).tolist(),
+        "susceptibility": chi.tolist(),
+        "energy_avg": (E_avg / N_total).tolist(),
+        "specific_heat": heat.tolist(),
+    }
+
+
+def single_histogram(point: Dict, temperatures: Sequence[float], N_total: int) -> Dict:
+    # Перевзвешивание одного измерения: надёжно только вблизи его температуры,
+    # пока нужные состояния ещё встречаются в гистограмме
+    histogram = point["histogram"]
+    E = np.asarray(histogram["energies"], dtype=float)
+    M = np.asarray(histogram["magnetizations"], dtype=float)
+    log_g = np.log(np.asarray(histogram["counts"], dtype=float)) + E / point["temperature"]
+    return _observables(np.asarray(temperatures, dtype=float), log_g, E, M, N_total)
+
+
+def _free_energy_objective(
+    f: np.ndarray, log_n: np.ndarray, n: np.ndarray, betas: np.ndarray, E: np.ndarray, H: np.ndarray
+):
+    # Выпуклая функция, минимум которой — решение уравнений Ferrenberg–Swendsen
+    # (формулировка MBAR): F(f) = Σ H(E, M)·ln Σₖ nₖ·exp(fₖ - E/Tₖ) - Σₖ nₖ·fₖ.
+    # Возвращает F, ln знаменателя и веса Wₖ(E, M) = nₖ·exp(fₖ - E/Tₖ) / знаменатель
+    log_terms = log_n[:, None] + f[:, None] - betas[:, None] * E[None, :]
+    log_denominator = _logsumexp(log_terms, axis=0)
+    W = np.exp(log_terms - log_denominator[None, :])
+    return H @ log_denominator - n @ f, log_denominator, W
+
+
+def multiple_histogram(
+    points: List[Dict],
+    temperatures: Sequence[float],
+    N_total: int,
+    tolerance: float = 1e-8,
+    max_iterations: int = 1000,
+) -> Dict:
+    # Самосогласованные уравнения Ferrenberg–Swendsen для K измерений:
+    #   g(E, M) = Σₖ Hₖ(E, M) / Σₖ nₖ·exp(fₖ - E/Tₖ),
+    #   exp(-fₖ) = Σ g(E, M)·exp(-E/Tₖ),
+    # f₀ = 0 фиксирует нормировку. Простые итерации сходятся линейно и на
+    # плотном скане требуют тысяч проходов по всем состояниям (десятки секунд
+    # для 25 точек по 5000 измерений на решетке 20x20), поэтому f ищется
+    # методом Ньютона с дроблением шага: матрица K × K, обычно несколько итераций
+    E_parts, M_parts, H_parts = [], [], []
+    for point in points:
+        histogram = point["histogram"]
+        E_parts.append(histogram["energies"])
+        M_parts.append(histogram["magnetizations"])
+        H_parts.append(histogram["counts"])
+
+    pairs = np.stack(
+        [np.concatenate(E_parts).astype(float), np.concatenate(M_parts).astype(float)], axis=1
+    )
+    states, inverse = np.unique(pairs, axis=0, return_inverse=True)
+    E, M = states[:, 0], states[:, 1]
+    H = np.bincount(np.ravel(inverse), weights=np.concatenate(H_parts).astype(float), minlength=len(E))
+
+    betas = 1.0 / np.array([point["temperature"] for point in points], dtype=float)
+    n = np.array([float(np.sum(counts)) for counts in H_parts])
+    log_n = np.log(n)
+    log_H = np.log(H)
+
+    # начальное приближение — термодинамическое интегрирование df/dβ = ⟨E⟩
+    # по средним энергиям измерений (метод трапеций в порядке роста β)
+    E_mean = np.array(
+        [np.dot(E_k, H_k) / n_k for E_k, H_k, n_k in zip(E_parts, H_parts, n)], dtype=float
+    )
+    order = np.argsort(betas)
+    f = np.empty(len(points))
+    f[order] = np.concatenate(
+        [[0.0], np.cumsum(0.5 * (E_mean[order][1:] + E_mean[order][:-1]) * np.diff(betas[order]))]
+    )
+    f -= f[0]
+    F, log_denominator, W = _free_energy_objective(f, log_n, n, betas, E, H)
+
+    for _ in range(max_iterations):
+        WH = W * H[None, :]
+        gradient = np.sum(WH, axis=1) - n
+        hessian = np.diag(np.sum(WH, axis=1)) - WH @ W.T
+        # f₀ закреплена: шаг только по остальным компонентам
+        step = np.zeros_like(f)
+        step[1:] = -np.linalg.lstsq(hessian[1:, 1:], gradient[1:], rcond=None)[0]
+        if np.max(np.abs(step)) < tolerance:
+            break
+
+        # шаг Ньютона с дроблением; F порядка числа измерений, поэтому
+        # сравнение идёт с допуском на ошибку округления
+        for scale in (1.0, 0.5, 0.25, 0.125):
+            f_new = f + scale * step
+            F_new, log_denominator_new, W_new = _free_energy_objective(f_new, log_n, n, betas, E, H)
+            if F_new <= F + 1e-12 * abs(F):
+                break
+        else:
+            # вдали от решения гессиан почти вырожден — простая итерация,
+            # она тоже не увеличивает F
+            f_new = -_logsumexp((log_H - log_denominator)[None, :] - betas[:, None] * E[None, :], axis=1)
+            f_new -= f_new[0]
+            F_new, log_denominator_new, W_new = _free_energy_objective(f_new, log_n, n, betas, E, H)
+
+        f, F, log_denominator, W = f_new, F_new, log_denominator_new, W_new
+
+    log_g = log_H - log_denominator
+    return _observables(np.asarray(temperatures, dtype=float), log_g, E, M, N_total)
+
+
+def reweight_scan(
+    points: List[Dict], T_min: float, T_max: float, n_points: int, N_total: int
+) -> Dict:
+    # Плотная сетка наблюдаемых по всем измеренным точкам скана
+    temperatures = np.linspace(T_min, T_max, n_points)
+    if len(points) == 1:
+        return single_histogram(points[0], temperatures, N_total)
+    return multiple_histogram(points, temperatures, N_total)
@@ -1,19 +1,32 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, FileResponse, JSONResponse
+from fastapi.responses import HTMLResponse, FileResponse, JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 import uvicorn
 import os
+import re
+import tempfile
 import uuid
 
+from domain import scan_large_lattice
 from ising_model import (
+    ALGORITHMS,
+    STATE_ENCODINGS,
+    UPDATE_LIMITS,
     IsingModel2D,
-    get_model,
     scan_temperature_ferromagnetic,
     find_critical_temperature,
 )
+from jobs import JobManager
+from kernels import KERNEL_BACKENDS
+from packed import PackedIsingModel2D
+from result_cache import cache_key, results
+from sessions import load_model_checkpoint, save_model_checkpoint, sessions
+from streaming import SimulationStream
+from tempering import parallel_tempering_scan
 
 
 app = FastAPI(title="Ising Model 2D Simulation")
@@ -30,27 +43,77 @@ STATIC_DIR = os.path.join(os.path.dirname(__file__), "static")
 os.makedirs(STATIC_DIR, exist_ok=True)
 
 
+ALGORITHM_PATTERN = "^(" + "|".join(ALGORITHMS) + ")$"
+
+# Число процессов для сканирований по температуре (по умолчанию — все ядра)
+SCAN_WORKERS = int(os.environ.get("ISING_SCAN_WORKERS", "0")) or None
+
+# Долгие сканирования выполняются фоновыми задачами, не блокируя цикл событий
+jobs = JobManager(max_workers=int(os.environ.get("ISING_JOB_WORKERS", "1")))
+
+# Контрольные точки сканирований и сессий
+CHECKPOINT_DIR = os.environ.get("ISING_CHECKPOINT_DIR") or os.path.join(
+    tempfile.gettempdir(), "ising_checkpoints"
+)
+os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+
+STEP_MODES = {
+    "steps": "metropolis",
+    "sweeps": "checkerboard",
+    "wolff": "wolff",
+    "swendsen_wang": "swendsen_wang",
+}
+
+# Предел n_steps для каждого режима — тот же, что у кадра WebSocket-трансляции
+STEP_LIMITS = {mode: UPDATE_LIMITS[algorithm] for mode, algorithm in STEP_MODES.items()}
+
+
 # Pydantic модели для API
-class InitRequest(BaseModel):
+class StateEncodingMixin(BaseModel):
+    encoding: str = Field(
+        "json",
+        pattern="^(" + "|".join(STATE_ENCODINGS) + ")$",
+        description="json — вложенные списки, packed — base64 битовой решетки, "
+        "delta — только изменившиеся узлы с версии since_version",
+    )
+    since_version: Optional[int] = Field(None, ge=0)
+
+
+class InitRequest(StateEncodingMixin):
     size: int = Field(30, ge=10, le=100)
     T: float = Field(1.0, ge=0.1, le=5.0)
     J: float = Field(1.0, ge=-2.0, le=2.0)
     B: float = Field(0.0, ge=-1.0, le=1.0)
     spins: Optional[List[List[int]]] = None
+    storage: str = Field(
+        "int8", pattern="^(int8|packed)$", description="int8 — байт на спин, packed — 64 спина в слове"
+    )
+    backend: str = Field(
+        "auto",
+        pattern="^(" + "|".join(KERNEL_BACKENDS) + ")$",
+        description="Ядро одиночных шагов Метрополиса: auto — numba, если установлена",
+    )
 
 
-class StepRequest(BaseModel):
+class StepRequest(StateEncodingMixin):
     session_id: str
     n_steps: int = Field(1, ge=1, le=10000)
+    mode: str = Field(
+        "steps",
+        pattern="^(" + "|".join(STEP_MODES) + ")$",
+        description="steps — одиночные шаги Метрополиса, sweeps — шахматные проходы по решетке, "
+        "wolff / swendsen_wang — кластерные обновления; предел n_steps зависит от режима (STEP_LIMITS)",
+    )
 
 
-class FlipRequest(BaseModel):
+class FlipRequest(StateEncodingMixin):
     session_id: str
-    i: int
-    j: int
+    # верхняя граница — размер решетки сессии, она проверяется в flip_spin
+    i: int = Field(..., ge=0)
+    j: int = Field(..., ge=0)
 
 
-class UpdateParamsRequest(BaseModel):
+class UpdateParamsRequest(StateEncodingMixin):
     session_id: str
     T: Optional[float] = None
     J: Optional[float] = None
@@ -66,75 +129,192 @@ async def root():
 async def init_model(req: InitRequest):
     try:
         session_id = str(uuid.uuid4())
-        model = IsingModel2D(size=req.size, T=req.T, J=req.J, B=req.B)
+        model_cls = PackedIsingModel2D if req.storage == "packed" else IsingModel2D
+        model = model_cls(size=req.size, T=req.T, J=req.J, B=req.B, backend=req.backend)
 
         if req.spins:
             model.set_spins(req.spins)
 
-        from ising_model import _models
-
-        _models[session_id] = model
+        await run_in_threadpool(sessions.put, session_id, model)
 
         return JSONResponse(
             content={
                 "success": True,
                 "session_id": session_id,
-                "state": model.get_state(),
+                "state": model.get_state(req.encoding),
             }
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _run_steps(req: StepRequest) -> Tuple[int, Dict]:
+    with sessions.session(req.session_id) as model:
+        accepted = model.run_updates(req.n_steps, STEP_MODES[req.mode])
+        return accepted, model.get_state(req.encoding, req.since_version)
+
+
 @app.post("/api/step")
 async def run_steps(req: StepRequest):
+    limit = STEP_LIMITS[req.mode]
+    if req.n_steps > limit:
+        raise HTTPException(
+            status_code=422, detail=f"n_steps must be at most {limit} for mode {req.mode}"
+        )
     try:
-        model = get_model(req.session_id)
-        accepted, spins = model.run_steps(req.n_steps)
+        # обновления и flock файловых сессий — в пуле потоков, не в цикле событий
+        accepted, state = await run_in_threadpool(_run_steps, req)
 
-        return JSONResponse(
-            content={
-                "success": True,
-                "accepted": accepted,
-                "state": model.get_state(),
-            }
-        )
+        return JSONResponse(content={"success": True, "accepted": accepted, "state": state})
     except KeyError:
         raise HTTPException(status_code=404, detail="Session not found")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _flip_spin(req: FlipRequest) -> Dict:
+    with sessions.session(req.session_id) as model:
+        model.flip_spin(req.i, req.j)
+        return model.get_state(req.encoding, req.since_version)
+
+
 @app.post("/api/flip")
 async def flip_spin(req: FlipRequest):
     try:
-        model = get_model(req.session_id)
-        model.flip_spin(req.i, req.j)
+        state = await run_in_threadpool(_flip_spin, req)
 
-        return JSONResponse(content={"success": True, "state": model.get_state()})
+        return JSONResponse(content={"success": True, "state": state})
     except KeyError:
         raise HTTPException(status_code=404, detail="Session not found")
+    except IndexError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/api/update_params")
-async def update_params(req: UpdateParamsRequest):
-    try:
-        model = get_model(req.session_id)
-
+def _update_params(req: UpdateParamsRequest) -> Dict:
+    with sessions.session(req.session_id) as model:
         if req.T is not None:
             model.T = req.T
         if req.J is not None:
             model.J = req.J
         if req.B is not None:
             model.B = req.B
+        return model.get_state(req.encoding, req.since_version)
+
 
-        return JSONResponse(content={"success": True, "state": model.get_state()})
+@app.post("/api/update_params")
+async def update_params(req: UpdateParamsRequest):
+    try:
+        state = await run_in_threadpool(_update_params, req)
+
+        return JSONResponse(content={"success": True, "state": state})
     except KeyError:
         raise HTTPException(status_code=404, detail="Session not found")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    return JSONResponse(content={"success": True, "stats": results.stats()})
+
+
+@app.get("/api/sessions/stats")
+async def session_stats():
+    return JSONResponse(content={"success": True, "stats": sessions.stats()})
+
+
+class RestoreRequest(StateEncodingMixin):
+    checkpoint: str = Field(..., description="Идентификатор контрольной точки сессии")
+
+
+def _session_checkpoint_path(checkpoint: str) -> str:
+    if not re.fullmatch(r"[A-Za-z0-9_-]+", checkpoint):
+        raise KeyError(checkpoint)
+    return os.path.join(CHECKPOINT_DIR, f"session-{checkpoint}.ckpt")
+
+
+def _checkpoint_session(session_id: str, path: str):
+    with sessions.session(session_id) as model:
+        save_model_checkpoint(path, model)
+
+
+@app.post("/api/sessions/{session_id}/checkpoint")
+async def checkpoint_session(session_id: str):
+    try:
+        path = _session_checkpoint_path(session_id)
+        await run_in_threadpool(_checkpoint_session, session_id, path)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    return JSONResponse(
+        content={"success": True, "checkpoint": session_id, "bytes": os.path.getsize(path)}
+    )
+
+
+@app.post("/api/sessions/restore")
+async def restore_session(req: RestoreRequest):
+    # решетка отображается из файла без чтения, поэтому большая сессия
+    # восстанавливается почти мгновенно
+    try:
+        model = await run_in_threadpool(load_model_checkpoint, _session_checkpoint_path(req.checkpoint))
+    except (KeyError, FileNotFoundError):
+        raise HTTPException(status_code=404, detail="Checkpoint not found")
+
+    session_id = str(uuid.uuid4())
+    await run_in_threadpool(sessions.put, session_id, model)
+    return JSONResponse(
+        content={
+            "success": True,
+            "session_id": session_id,
+            "state": model.get_state(req.encoding),
+        }
+    )
+
+
+def _lattice(session_id: str, since_version: Optional[int]) -> Tuple[bytes, Dict[str, str]]:
+    with sessions.session(session_id) as model:
+        headers = {
+            "X-Lattice-Size": str(model.size),
+            "X-Lattice-Version": str(model.version),
+            "X-Magnetization": repr(model.calculate_magnetization()),
+            "X-Energy": repr(model.calculate_energy()),
+        }
+        changed = model.lattice_delta(since_version) if since_version is not None else None
+        if changed is not None:
+            headers["X-Lattice-Encoding"] = "delta"
+            headers["X-Lattice-Base-Version"] = str(since_version)
+            return changed.astype("<u4").tobytes(), headers
+        headers["X-Lattice-Encoding"] = "packed"
+        return model.lattice_bytes(), headers
+
+
+@app.get("/api/lattice/{session_id}")
+async def lattice(session_id: str, since_version: Optional[int] = None):
+    # Решетка без JSON: битовая упаковка (N²/8 байт) или, при известной клиенту
+    # версии, номера изменившихся узлов как uint32 little-endian
+    try:
+        content, headers = await run_in_threadpool(_lattice, session_id, since_version)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    return Response(content=content, media_type="application/octet-stream", headers=headers)
+
+
+@app.websocket("/ws/{session_id}")
+async def stream_session(websocket: WebSocket, session_id: str):
+    if session_id not in sessions:
+        await websocket.close(code=4404)
+        return
+
+    await websocket.accept()
+    try:
+        await SimulationStream(lambda: sessions.session(session_id)).run(websocket)
+    except WebSocketDisconnect:
+        pass
+
+
 class FerromagneticScanRequest(BaseModel):
     size: int = Field(20, ge=10, le=50, description="Размер решетки")
     J: float = Field(1.0, ge=0.1, le=2.0, description="Обменное взаимодействие")
@@ -144,6 +324,24 @@ class FerromagneticScanRequest(BaseModel):
     T_steps: int = Field(25, ge=10, le=50)
     equilibration_steps: int = Field(2000, ge=500, le=10000)
     measurement_steps: int = Field(1000, ge=500, le=5000)
+    algorithm: str = Field("metropolis", pattern=ALGORITHM_PATTERN)
+    seed: Optional[int] = Field(None, ge=0)
+    replicas: int = Field(
+        1, ge=1, le=64, description="Число независимых решеток на температуру (metropolis/checkerboard)"
+    )
+    reweight_points: int = Field(
+        0, ge=0, le=1000, description="Точек плотной сетки для гистограммного перевзвешивания (0 — выключено)"
+    )
+    auto_sampling: bool = Field(
+        False, description="Автоматическое равновесие, τ_int, прореживание и ошибки jackknife"
+    )
+    effective_samples: int = Field(100, ge=10, le=10000, description="Цель по числу независимых выборок")
+    checkpoint: bool = Field(
+        False, description="Сохранять контрольные точки и продолжать прерванное сканирование"
+    )
+    reuse_cached: bool = Field(
+        False, description="Вернуть сохранённый результат и для запроса без seed"
+    )
 
 
 class CriticalTemperatureRequest(BaseModel):
@@ -152,20 +350,76 @@ class CriticalTemperatureRequest(BaseModel):
     T_min: float = Field(1.5, ge=0.5, le=2.0)
     T_max: float = Field(3.5, ge=2.5, le=5.0)
     T_steps: int = Field(30, ge=15, le=50)
+    algorithm: str = Field("metropolis", pattern=ALGORITHM_PATTERN)
+    seed: Optional[int] = Field(None, ge=0)
+    replicas: int = Field(
+        1, ge=1, le=64, description="Число независимых решеток на температуру (metropolis/checkerboard)"
+    )
+    adaptive: bool = Field(
+        False, description="Грубая сетка и уточнение вокруг максимума χ вместо равномерной сетки T_steps"
+    )
+    points_per_round: int = Field(8, ge=4, le=32, description="Точек за раунд адаптивного режима")
+    tolerance: float = Field(0.01, ge=0.001, le=0.5, description="Целевая точность T_c")
+    max_rounds: int = Field(5, ge=1, le=10)
+    reweight: bool = Field(
+        False, description="Уточнять пик χ перевзвешиванием гистограмм (в обоих режимах)"
+    )
+    checkpoint: bool = Field(
+        False, description="Сохранять контрольные точки и продолжать прерванное сканирование"
+    )
+    reuse_cached: bool = Field(
+        False, description="Вернуть сохранённый результат и для запроса без seed"
+    )
+
+
+class ParallelTemperingRequest(BaseModel):
+    size: int = Field(20, ge=10, le=50, description="Размер решетки")
+    J: float = Field(1.0, ge=-2.0, le=2.0, description="Обменное взаимодействие")
+    B: float = Field(0.0, ge=-1.0, le=1.0, description="Внешнее поле")
+    T_min: float = Field(0.5, ge=0.1, le=2.0)
+    T_max: float = Field(4.0, ge=2.0, le=6.0)
+    T_steps: int = Field(25, ge=2, le=50)
+    equilibration_steps: int = Field(1000, ge=100, le=10000)
+    measurement_steps: int = Field(1000, ge=100, le=5000)
+    swap_interval: int = Field(10, ge=1, le=1000, description="Шагов между попытками обмена")
+    algorithm: str = Field("checkerboard", pattern=ALGORITHM_PATTERN)
+    seed: Optional[int] = Field(None, ge=0)
+
+
+class LargeLatticeScanRequest(BaseModel):
+    size: int = Field(1024, ge=128, le=8192, multiple_of=2, description="Размер решетки (чётный)")
+    J: float = Field(1.0, ge=0.1, le=2.0, description="Обменное взаимодействие")
+    B: float = Field(0.0, ge=-1.0, le=1.0, description="Внешнее поле")
+    T_min: float = Field(2.0, ge=0.1, le=2.0)
+    T_max: float = Field(2.6, ge=2.0, le=6.0)
+    T_steps: int = Field(7, ge=2, le=50)
+    equilibration_sweeps: int = Field(200, ge=10, le=10000)
+    measurement_sweeps: int = Field(200, ge=10, le=10000)
+    seed: Optional[int] = Field(None, ge=0)
+    reuse_cached: bool = Field(
+        False, description="Вернуть сохранённый результат и для запроса без seed"
+    )
+
+
+def _scan_params(kind: str, req: BaseModel) -> Tuple[Dict, bool, Dict]:
+    # Параметры, от которых зависит результат (ключ кэша), флаг reuse и
+    # служебные аргументы. Запросы с seed воспроизводимы и всегда берутся из
+    # кэша, без seed — только если клиент согласен на сохранённый результат.
+    # Контрольная точка адресуется тем же ключом: повтор запроса после
+    # перезапуска сервера продолжает прерванное сканирование.
+    params = req.model_dump(exclude={"reuse_cached", "checkpoint"})
+    options = {"n_workers": SCAN_WORKERS}
+    if getattr(req, "checkpoint", False):
+        options["checkpoint_path"] = os.path.join(CHECKPOINT_DIR, cache_key(kind, params) + ".ckpt")
+    return params, req.seed is not None or req.reuse_cached, options
 
 
 @app.post("/api/ferromagnetic_scan")
 async def ferromagnetic_scan(req: FerromagneticScanRequest):
     try:
-        result = scan_temperature_ferromagnetic(
-            size=req.size,
-            J=req.J,
-            B=req.B,
-            T_min=req.T_min,
-            T_max=req.T_max,
-            T_steps=req.T_steps,
-            equilibration_steps=req.equilibration_steps,
-            measurement_steps=req.measurement_steps,
+        params, reuse, options = _scan_params("ferromagnetic_scan", req)
+        result = await run_in_threadpool(
+            results.cached("ferromagnetic_scan", scan_temperature_ferromagnetic, reuse), **params, **options
         )
         return JSONResponse(content={"success": True, "data": result})
     except Exception as e:
@@ -175,17 +429,112 @@ async def ferromagnetic_scan(req: FerromagneticScanRequest):
 @app.post("/api/find_critical_temperature")
 async def find_tc(req: CriticalTemperatureRequest):
     try:
-        result = find_critical_temperature(
-            size=req.size,
-            J=req.J,
-            T_min=req.T_min,
-            T_max=req.T_max,
-            T_steps=req.T_steps,
+        params, reuse, options = _scan_params("find_critical_temperature", req)
+        result = await run_in_threadpool(
+            results.cached("find_critical_temperature", find_critical_temperature, reuse), **params, **options
         )
         return JSONResponse(content={"success": True, "data": result})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+
+@app.post("/api/parallel_tempering_scan")
+async def parallel_tempering(req: ParallelTemperingRequest):
+    try:
+        result = await run_in_threadpool(parallel_tempering_scan, **req.model_dump())
+        return JSONResponse(content={"success": True, "data": result})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/jobs/ferromagnetic_scan")
+async def submit_ferromagnetic_scan(req: FerromagneticScanRequest):
+    params, reuse, options = _scan_params("ferromagnetic_scan", req)
+    job = jobs.submit(
+        "ferromagnetic_scan",
+        results.cached("ferromagnetic_scan", scan_temperature_ferromagnetic, reuse),
+        params,
+        total=req.T_steps,
+        **options,
+    )
+    return JSONResponse(content={"success": True, "job_id": job.id, "job": job.to_dict()})
+
+
+@app.post("/api/jobs/find_critical_temperature")
+async def submit_find_tc(req: CriticalTemperatureRequest):
+    params, reuse, options = _scan_params("find_critical_temperature", req)
+    job = jobs.submit(
+        "find_critical_temperature",
+        results.cached("find_critical_temperature", find_critical_temperature, reuse),
+        params,
+        total=req.points_per_round * req.max_rounds if req.adaptive else req.T_steps,
+        **options,
+    )
+    return JSONResponse(content={"success": True, "job_id": job.id, "job": job.to_dict()})
+
+
+@app.post("/api/jobs/parallel_tempering_scan")
+async def submit_parallel_tempering(req: ParallelTemperingRequest):
+    job = jobs.submit(
+        "parallel_tempering_scan",
+        parallel_tempering_scan,
+        req.model_dump(),
+        total=req.T_steps,
+        progress=True,
+    )
+    return JSONResponse(content={"success": True, "job_id": job.id, "job": job.to_dict()})
+
+
+@app.post("/api/jobs/large_lattice_scan")
+async def submit_large_lattice_scan(req: LargeLatticeScanRequest):
+    # только фоновой задачей: проход по решетке 8192² занимает секунды
+    params, reuse, options = _scan_params("large_lattice_scan", req)
+    job = jobs.submit(
+        "large_lattice_scan",
+        results.cached("large_lattice_scan", scan_large_lattice, reuse),
+        params,
+        total=req.T_steps,
+        **options,
+    )
+    return JSONResponse(content={"success": True, "job_id": job.id, "job": job.to_dict()})
+
+
+@app.get("/api/jobs")
+async def list_jobs():
+    return JSONResponse(content={"success": True, "jobs": jobs.list_jobs()})
+
+
+@app.get("/api/jobs/{job_id}")
+async def job_status(job_id: str):
+    try:
+        job = jobs.get(job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JSONResponse(content={"success": True, "job": job.to_dict()})
+
+
+@app.get("/api/jobs/{job_id}/result")
+async def job_result(job_id: str):
+    try:
+        job = jobs.get(job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=job.error)
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    return JSONResponse(content={"success": True, "data": job.result})
+
+
+@app.delete("/api/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    try:
+        job = jobs.cancel(job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JSONResponse(content={"success": True, "job": job.to_dict()})
+
 try:
     app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 except Exception:
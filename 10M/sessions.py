@@ -0,0 +1,418 @@
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Tuple
+
+import numpy as np
+
+from checkpoint import load_checkpoint, save_checkpoint
+from ising_model import IsingModel2D
+from packed import PackedIsingModel2D
+
+MODEL_CLASSES = {cls.storage: cls for cls in (IsingModel2D, PackedIsingModel2D)}
+
+
+class SessionBackend:
+    def get(self, session_id: str) -> IsingModel2D:
+        raise NotImplementedError
+
+    def put(self, session_id: str, model: IsingModel2D):
+        raise NotImplementedError
+
+    def delete(self, session_id: str):
+        raise NotImplementedError
+
+    def stats(self) -> Dict:
+        raise NotImplementedError
+
+    def __contains__(self, session_id: str) -> bool:
+        try:
+            self.get(session_id)
+        except KeyError:
+            return False
+        return True
+
+    @contextmanager
+    def session(self, session_id: str) -> Iterator[IsingModel2D]:
+        # изменения модели внутри блока сохраняются бэкендом при выходе
+        yield self.get(session_id)
+
+
+class SessionStore(SessionBackend):
+    # Сессии упорядочены по последнему обращению: вытесняются самые давно
+    # не использованные, когда суммарная память решеток превышает max_bytes,
+    # и любые, простаивающие дольше ttl секунд.
+    def __init__(
+        self,
+        max_bytes: int = 256 * 1024 * 1024,
+        ttl: float = 3600.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._clock = clock
+        self._sessions: "OrderedDict[str, Tuple[IsingModel2D, float, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # блокировка каждой сессии: поток WebSocket-трансляции и запросы API
+        # не должны менять одну модель (решетку, M, bonds, снимки) одновременно
+        self._session_locks: Dict[str, threading.RLock] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def get(self, session_id: str) -> IsingModel2D:
+        with self._lock:
+            now = self._clock()
+            self._expire(now)
+            if session_id not in self._sessions:
+                self.misses += 1
+                raise KeyError(session_id)
+
+            model, _, nbytes = self._sessions.pop(session_id)
+            # снимки для дельта-кодирования растут, поэтому размер пересчитываем
+            self._bytes -= nbytes
+            self._insert(session_id, model, now)
+            self.hits += 1
+            self._evict(keep=session_id)
+            return model
+
+    def put(self, session_id: str, model: IsingModel2D):
+        with self._lock:
+            now = self._clock()
+            self._expire(now)
+            self._remove(session_id, keep_lock=True)
+            self._insert(session_id, model, now)
+            self._evict(keep=session_id)
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._remove(session_id)
+
+    @contextmanager
+    def session(self, session_id: str) -> Iterator[IsingModel2D]:
+        model = self.get(session_id)
+        with self._lock:
+            lock = self._session_locks.setdefault(session_id, threading.RLock())
+        with lock:
+            yield model
+
+    def expire(self):
+        with self._lock:
+            self._expire(self._clock())
+
+    def _insert(self, session_id: str, model: IsingModel2D, now: float):
+        nbytes = model.nbytes
+        self._sessions[session_id] = (model, now, nbytes)
+        self._bytes += nbytes
+
+    def _remove(self, session_id: str, keep_lock: bool = False) -> bool:
+        if not keep_lock:
+            self._session_locks.pop(session_id, None)
+        entry = self._sessions.pop(session_id, None)
+        if entry is None:
+            return False
+        self._bytes -= entry[2]
+        return True
+
+    def _expire(self, now: float):
+        while self._sessions:
+            session_id, (_, last_access, _) = next(iter(self._sessions.items()))
+            if now - last_access <= self.ttl:
+                break
+            self._remove(session_id)
+            self.expirations += 1
+
+    def _evict(self, keep: str):
+        while self._bytes > self.max_bytes and len(self._sessions) > 1:
+            session_id = next(iter(self._sessions))
+            if session_id == keep:
+                break
+            self._remove(session_id)
+            self.evictions += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "sessions": len(self._sessions),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class MmapSessionBackend(SessionBackend):
+    # Каждая сессия — файл: заголовок JSON фиксированного размера (параметры,
+    # суммы M и bonds, версия, состояние генератора) и сырой буфер решетки.
+    # Решетка открывается через np.memmap, поэтому все процессы uvicorn видят
+    # одни и те же байты без копирования; доступ к сессии сериализуется flock.
+    MAGIC = b"ISING1\n"
+    HEADER_SIZE = 4096
+    SUFFIX = ".lattice"
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int = 256 * 1024 * 1024,
+        ttl: float = 3600.0,
+        cache_size: int = 256,
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.cache_size = cache_size
+        os.makedirs(directory, exist_ok=True)
+        # модели, уже отображённые в этом процессе: буфер переиспользуется,
+        # при каждом доступе перечитывается только заголовок
+        self._models: "OrderedDict[str, IsingModel2D]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _path(self, session_id: str) -> str:
+        if not re.fullmatch(r"[A-Za-z0-9_-]+", session_id):
+            raise KeyError(session_id)
+        return os.path.join(self.directory, session_id + self.SUFFIX)
+
+    def _read_header(self, f) -> Dict:
+        f.seek(0)
+        raw = f.read(self.HEADER_SIZE)
+        if not raw.startswith(self.MAGIC):
+            raise ValueError("Not an Ising session file")
+        return json.loads(raw[len(self.MAGIC) :].rstrip(b" "))
+
+    def _write_header(self, f, model: IsingModel2D):
+        buffer = model.lattice_buffer
+        header = model.export_state()
+        header["dtype"] = buffer.dtype.str
+        header["shape"] = list(buffer.shape)
+        data = self.MAGIC + json.dumps(header).encode()
+        if len(data) > self.HEADER_SIZE:
+            raise ValueError("Session header is too large")
+        f.seek(0)
+        f.write(data.ljust(self.HEADER_SIZE, b" "))
+
+    def _write(self, f, model: IsingModel2D):
+        f.truncate(0)
+        self._write_header(f, model)
+        f.write(np.ascontiguousarray(model.lattice_buffer).tobytes())
+        f.flush()
+
+    def _map(self, path: str, header: Dict) -> np.memmap:
+        return np.memmap(
+            path,
+            dtype=np.dtype(header["dtype"]),
+            mode="r+",
+            offset=self.HEADER_SIZE,
+            shape=tuple(header["shape"]),
+        )
+
+    def _load(self, session_id: str, path: str, f) -> IsingModel2D:
+        header = self._read_header(f)
+        with self._lock:
+            model = self._models.get(session_id)
+            buffer = model.lattice_buffer if model is not None else None
+            if (
+                model is not None
+                and model.storage == header["storage"]
+                and isinstance(buffer, np.memmap)
+                and buffer.dtype.str == header["dtype"]
+                and list(buffer.shape) == header["shape"]
+            ):
+                model.load_state(header)
+                self._models.move_to_end(session_id)
+                return model
+
+        model = MODEL_CLASSES[header["storage"]].from_buffer(
+            header, self._map(path, header)
+        )
+        self._cache(session_id, model)
+        return model
+
+    def _cache(self, session_id: str, model: IsingModel2D):
+        with self._lock:
+            self._models[session_id] = model
+            self._models.move_to_end(session_id)
+            while len(self._models) > self.cache_size:
+                self._models.popitem(last=False)
+
+    @contextmanager
+    def _locked(self, session_id: str, exclusive: bool):
+        import fcntl
+
+        path = self._path(session_id)
+        try:
+            f = open(path, "r+b")
+        except FileNotFoundError:
+            self.misses += 1
+            raise KeyError(session_id)
+        with f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield path, f
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def get(self, session_id: str) -> IsingModel2D:
+        with self._locked(session_id, exclusive=False) as (path, f):
+            model = self._load(session_id, path, f)
+        self.hits += 1
+        return model
+
+    @contextmanager
+    def session(self, session_id: str) -> Iterator[IsingModel2D]:
+        with self._locked(session_id, exclusive=True) as (path, f):
+            model = self._load(session_id, path, f)
+            self.hits += 1
+            try:
+                yield model
+            except BaseException:
+                # решетка в файле могла измениться на месте до исключения:
+                # пересчитываем суммы по ней и сдвигаем версию, чтобы заголовок
+                # и дельты клиентов соответствовали файлу
+                model._recompute_totals()
+                model.version += 1
+                raise
+            finally:
+                self._save(session_id, path, f, model)
+
+    def _save(self, session_id: str, path: str, f, model: IsingModel2D):
+        buffer = model.lattice_buffer
+        if isinstance(buffer, np.memmap) and buffer.filename == os.path.abspath(path):
+            # решетка менялась на месте прямо в отображённом файле
+            buffer.flush()
+            self._write_header(f, model)
+            f.flush()
+            return
+
+        # массив заменён целиком (set_spins, перепаковка) — переписываем файл
+        self._write(f, model)
+        model.lattice_buffer = self._map(path, self._read_header(f))
+        self._cache(session_id, model)
+
+    def put(self, session_id: str, model: IsingModel2D):
+        path = self._path(session_id)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            self._write(f, model)
+        os.replace(tmp_path, path)
+
+        with open(path, "rb") as f:
+            header = self._read_header(f)
+        model.lattice_buffer = self._map(path, header)
+        self._cache(session_id, model)
+        self.expire(keep=session_id)
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._models.pop(session_id, None)
+        try:
+            os.remove(self._path(session_id))
+        except FileNotFoundError:
+            pass
+
+    def __contains__(self, session_id: str) -> bool:
+        try:
+            return os.path.exists(self._path(session_id))
+        except KeyError:
+            return False
+
+    def _files(self):
+        files = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(self.SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, name[: -len(self.SUFFIX)]))
+        return sorted(files)
+
+    def expire(self, keep: str = ""):
+        now = time.time()
+        files = self._files()
+        total = sum(size for _, size, _ in files)
+        for mtime, size, session_id in files:
+            if session_id == keep:
+                continue
+            if now - mtime > self.ttl:
+                self.expirations += 1
+            elif total > self.max_bytes:
+                self.evictions += 1
+            else:
+                continue
+            self.delete(session_id)
+            total -= size
+
+    def stats(self) -> Dict:
+        files = self._files()
+        return {
+            "backend": "mmap",
+            "directory": self.directory,
+            "sessions": len(files),
+            "bytes": sum(size for _, size, _ in files),
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+def _default_session_dir() -> str:
+    # /dev/shm держит файлы в оперативной памяти, если доступен
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, "ising_sessions")
+
+
+def save_model_checkpoint(path: str, model: IsingModel2D):
+    save_checkpoint(path, {"model": model.export_state()}, {"lattice": model.lattice_buffer})
+
+
+def load_model_checkpoint(path: str) -> IsingModel2D:
+    # решетка отображается с копированием при записи: страницы читаются
+    # с диска только при обращении, файл контрольной точки не меняется
+    header, arrays = load_checkpoint(path)
+    state = header["model"]
+    return MODEL_CLASSES[state["storage"]].from_buffer(state, arrays["lattice"])
+
+
+def create_backend() -> SessionBackend:
+    max_bytes = int(os.environ.get("ISING_SESSION_MAX_BYTES", 256 * 1024 * 1024))
+    ttl = float(os.environ.get("ISING_SESSION_TTL", 3600))
+    backend = os.environ.get("ISING_SESSION_BACKEND", "memory")
+    if backend == "memory":
+        return SessionStore(max_bytes=max_bytes, ttl=ttl)
+    if backend == "mmap":
+        directory = os.environ.get("ISING_SESSION_DIR") or _default_session_dir()
+        return MmapSessionBackend(directory, max_bytes=max_bytes, ttl=ttl)
+    raise ValueError(f"Unknown session backend: {backend}")
+
+
+sessions = create_backend()
+
+
+def get_model(session_id: str) -> IsingModel2D:
+    return sessions.get(session_id)
@@ -0,0 +1,222 @@
+import asyncio
+import base64
+import time
+from typing import Callable, ContextManager, Dict, List, Optional, Tuple
+
+from fastapi import WebSocket
+from starlette.concurrency import run_in_threadpool
+
+from ising_model import ALGORITHMS, UPDATE_LIMITS, IsingModel2D, changed_sites
+
+MAX_FPS = 60.0
+
+
+class SimulationStream:
+    # Симуляция крутится на сервере и пишет в «почтовый ящик» только последний
+    # кадр; отправитель шлёт его, как только клиент готов, поэтому при медленном
+    # клиенте промежуточные кадры отбрасываются, а не копятся в очереди.
+    # Модель открывается через open_session на каждый шаг, чтобы бэкенд сессий
+    # мог держать блокировку и сохранять изменения между кадрами.
+    def __init__(
+        self,
+        open_session: Callable[[], ContextManager[IsingModel2D]],
+        fps: float = 20.0,
+        steps_per_frame: int = 1,
+        algorithm: str = "checkerboard",
+    ):
+        self.open_session = open_session
+        self.fps = fps
+        self.algorithm = algorithm
+        # запрошенное клиентом число шагов; фактическое ограничено
+        # UPDATE_LIMITS текущего алгоритма и пересчитывается при его смене
+        self._requested_steps = steps_per_frame
+        self._clamp_steps()
+        self.running = False
+
+        self._commands: asyncio.Queue = asyncio.Queue()
+        self._command_ready = asyncio.Event()
+        self._frame: Optional[Dict] = None
+        # ошибки идут отдельной очередью: кадр не должен их вытеснить
+        self._errors: List[Dict] = []
+        self._frame_ready = asyncio.Event()
+        self._accepted = 0
+        self._steps = 0
+        self._dropped = 0
+        self._sent_version: Optional[int] = None
+        self._sent_packed: Optional[bytes] = None
+
+    async def run(self, websocket: WebSocket):
+        tasks = [
+            asyncio.create_task(self._receive(websocket)),
+            asyncio.create_task(self._simulate()),
+            asyncio.create_task(self._send(websocket)),
+        ]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _receive(self, websocket: WebSocket):
+        while True:
+            message = await websocket.receive_json()
+            await self._commands.put(message)
+            self._command_ready.set()
+
+    def _apply(self, model: IsingModel2D, message: Dict) -> bool:
+        # возвращает True, если команда изменила состояние и нужен новый кадр
+        kind = message.get("type")
+        if kind == "config":
+            if "fps" in message:
+                self.fps = min(MAX_FPS, max(1.0, float(message["fps"])))
+            if "steps_per_frame" in message:
+                self._requested_steps = int(message["steps_per_frame"])
+            if "algorithm" in message:
+                if message["algorithm"] not in ALGORITHMS:
+                    raise ValueError(f"Unknown algorithm: {message['algorithm']}")
+                self.algorithm = message["algorithm"]
+            self._clamp_steps()
+            if "running" in message:
+                self.running = bool(message["running"])
+            return False
+        if kind == "start":
+            self.running = True
+            return False
+        if kind == "stop":
+            self.running = False
+            return False
+        if kind == "params":
+            for name in ("T", "J", "B"):
+                if message.get(name) is not None:
+                    setattr(model, name, float(message[name]))
+            return True
+        if kind == "flip":
+            model.flip_spin(int(message["i"]), int(message["j"]))
+            return True
+        if kind == "frame":
+            return True
+        raise ValueError(f"Unknown message type: {kind}")
+
+    def _clamp_steps(self):
+        self.steps_per_frame = min(UPDATE_LIMITS[self.algorithm], max(1, self._requested_steps))
+
+    def _tick(self, messages: List[Dict], force: bool) -> Tuple[Optional[Dict], List[str]]:
+        # выполняется в пуле потоков: команды клиента, порция шагов и снимок кадра
+        errors = []
+        changed = force
+        with self.open_session() as model:
+            for message in messages:
+                try:
+                    changed |= self._apply(model, message)
+                except (KeyError, TypeError, ValueError, IndexError) as e:
+                    errors.append(str(e))
+
+            if self.running:
+                self._accepted += model.run_updates(self.steps_per_frame, self.algorithm)
+                self._steps += self.steps_per_frame
+                changed = True
+
+            frame = self._snapshot(model) if changed else None
+        return frame, errors
+
+    async def _simulate(self):
+        force = True
+        while True:
+            started = time.monotonic()
+            # сброс до разбора очереди: команда, пришедшая позже, снова взведёт событие
+            self._command_ready.clear()
+            messages = []
+            while not self._commands.empty():
+                messages.append(self._commands.get_nowait())
+
+            try:
+                frame, errors = await run_in_threadpool(self._tick, messages, force)
+            except KeyError:
+                # сессия истекла или удалена: останавливаемся и сообщаем клиенту
+                self.running = False
+                errors, frame = ["Session not found"], None
+            force = False
+
+            for detail in errors:
+                self._publish_error(detail)
+            if frame is not None:
+                self._publish(frame)
+
+            timeout = max(0.0, 1.0 / self.fps - (time.monotonic() - started))
+            if self.running:
+                await asyncio.sleep(timeout)
+            else:
+                # на паузе ждём только команд клиента, не вынимая их из очереди
+                await self._command_ready.wait()
+
+    def _snapshot(self, model: IsingModel2D) -> Dict:
+        return {
+            "type": "frame",
+            "packed": model.lattice_bytes(),
+            "version": model.version,
+            "magnetization": model.calculate_magnetization(),
+            "energy": model.calculate_energy(),
+            "size": model.size,
+            "T": model.T,
+            "J": model.J,
+            "B": model.B,
+            "accepted": self._accepted,
+            "steps": self._steps,
+        }
+
+    def _publish(self, frame: Dict):
+        if self._frame is not None:
+            self._dropped += 1
+        self._frame = frame
+        self._frame_ready.set()
+
+    def _publish_error(self, detail: str):
+        self._errors.append({"type": "error", "detail": detail})
+        self._frame_ready.set()
+
+    def _encode(self, frame: Dict) -> Dict:
+        state = {
+            "magnetization": frame["magnetization"],
+            "energy": frame["energy"],
+            "size": frame["size"],
+            "T": frame["T"],
+            "J": frame["J"],
+            "B": frame["B"],
+            "version": frame["version"],
+        }
+        packed = frame["packed"]
+        n_sites = frame["size"] * frame["size"]
+        if self._sent_packed is not None and len(self._sent_packed) == len(packed):
+            changed = changed_sites(self._sent_packed, packed, n_sites)
+            if changed.size * 5 < n_sites // 6:
+                state["encoding"] = "delta"
+                state["base_version"] = self._sent_version
+                state["changed"] = changed.tolist()
+        if "encoding" not in state:
+            state["encoding"] = "packed"
+            state["spins_packed"] = base64.b64encode(packed).decode("ascii")
+
+        self._sent_packed = packed
+        self._sent_version = frame["version"]
+        return {
+            "type": "frame",
+            "state": state,
+            "accepted": frame["accepted"],
+            "steps": frame["steps"],
+            "dropped": self._dropped,
+            "running": self.running,
+        }
+
+    async def _send(self, websocket: WebSocket):
+        while True:
+            await self._frame_ready.wait()
+            self._frame_ready.clear()
+            errors, self._errors = self._errors, []
+            for error in errors:
+                await websocket.send_json(error)
+            frame, self._frame = self._frame, None
+            if frame is not None:
+                await websocket.send_json(self._encode(frame))
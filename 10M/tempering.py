@@ -0,0 +1,111 @@
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from ising_model import (
+    ALGORITHMS,
+    IsingModel2D,
+    ScanCancelled,
+    collect_scan_results,
+    temperature_observables,
+)
+
+
+def _swap_configurations(a: IsingModel2D, b: IsingModel2D):
+    a.spins, b.spins = b.spins, a.spins
+    a._M, b._M = b._M, a._M
+    a._bonds, b._bonds = b._bonds, a._bonds
+
+
+def attempt_swaps(
+    replicas: List[IsingModel2D], rng: np.random.Generator, offset: int
+) -> np.ndarray:
+    # Обмен конфигурациями соседних температур с вероятностью
+    # min(1, exp((βᵢ - βⱼ)(Eᵢ - Eⱼ))) сохраняет детальный баланс расширенного ансамбля
+    accepted = np.zeros(len(replicas) - 1, dtype=bool)
+    for k in range(offset, len(replicas) - 1, 2):
+        a, b = replicas[k], replicas[k + 1]
+        delta = (1.0 / (a.kB * a.T) - 1.0 / (b.kB * b.T)) * (
+            a.calculate_energy() - b.calculate_energy()
+        )
+        if delta >= 0 or rng.random() < np.exp(delta):
+            _swap_configurations(a, b)
+            accepted[k] = True
+    return accepted
+
+
+def parallel_tempering_scan(
+    size: int = 20,
+    J: float = 1.0,
+    B: float = 0.0,
+    T_min: float = 0.5,
+    T_max: float = 4.0,
+    T_steps: int = 25,
+    equilibration_steps: int = 2000,
+    measurement_steps: int = 1000,
+    swap_interval: int = 10,
+    algorithm: str = "checkerboard",
+    seed: Optional[int] = None,
+    on_point: Optional[Callable[[Dict], None]] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+) -> Dict:
+    # Все температуры измеряются одновременно, поэтому on_point вызывается
+    # только в конце; ход расчёта сообщает on_progress(шаг, всего шагов)
+    # после каждой попытки обмена
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"Unknown algorithm: {algorithm}")
+    if T_steps < 2:
+        raise ValueError("Parallel tempering needs at least two temperatures")
+
+    temperatures = np.linspace(T_min, T_max, T_steps)
+    seeds = np.random.SeedSequence(seed).spawn(T_steps + 1)
+    swap_rng = np.random.default_rng(seeds[-1])
+    replicas = [
+        IsingModel2D(size=size, T=T, J=J, B=B, seed=replica_seed)
+        for T, replica_seed in zip(temperatures, seeds)
+    ]
+
+    swap_attempts = np.zeros(T_steps - 1, dtype=int)
+    swap_accepted = np.zeros(T_steps - 1, dtype=int)
+    magnetizations = np.zeros((T_steps, measurement_steps))
+    energies = np.zeros((T_steps, measurement_steps))
+
+    n_steps = equilibration_steps + measurement_steps
+    n_swaps = 0
+    for step in range(n_steps):
+        if should_stop is not None and should_stop():
+            raise ScanCancelled()
+
+        for model in replicas:
+            model.update(algorithm)
+
+        if (step + 1) % swap_interval == 0:
+            offset = n_swaps % 2
+            swap_attempts[offset::2] += 1
+            swap_accepted += attempt_swaps(replicas, swap_rng, offset)
+            n_swaps += 1
+            if on_progress is not None:
+                on_progress(step + 1, n_steps)
+
+        k = step - equilibration_steps
+        if k >= 0:
+            for slot, model in enumerate(replicas):
+                magnetizations[slot, k] = model.total_magnetization()
+                energies[slot, k] = model.calculate_energy()
+
+    if on_progress is not None:
+        on_progress(n_steps, n_steps)
+
+    points = []
+    for slot, T in enumerate(temperatures):
+        point = temperature_observables(T, magnetizations[slot], energies[slot], size * size)
+        points.append(point)
+        if on_point is not None:
+            on_point(point)
+
+    results = collect_scan_results(points)
+    results["swap_acceptance"] = [
+        float(acc / att) if att else 0.0 for acc, att in zip(swap_accepted, swap_attempts)
+    ]
+    return results
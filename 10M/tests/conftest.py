@@ -0,0 +1,5 @@
+import os
+import sys
+
+# модули движка лежат в каталоге 10M, а не в установленном пакете
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
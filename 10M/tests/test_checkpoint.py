@@ -0,0 +1,112 @@
+import glob
+
+import numpy as np
+import pytest
+
+import ising_model
+from checkpoint import ScanCheckpoint, load_checkpoint, save_checkpoint
+from ising_model import ScanCancelled, _measure_temperature, scan_temperature_ferromagnetic
+
+SCAN = dict(size=6, T_min=1.5, T_max=3.0, T_steps=4, equilibration_steps=300, measurement_steps=300, seed=5)
+
+
+class Interrupted(Exception):
+    pass
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_save_load_round_trip(tmp_path, mmap):
+    path = str(tmp_path / "state.ckpt")
+    lattice = np.arange(-50, 50, dtype=np.int8).reshape(10, 10)
+    series = np.linspace(0.0, 1.0, 7)
+    arrays = {"lattice": lattice, "series": series, "empty": series[:0]}
+    save_checkpoint(path, {"done": 3, "model": {"T": 2.0}}, arrays)
+    header, arrays = load_checkpoint(path, mmap=mmap)
+    assert header == {"done": 3, "model": {"T": 2.0}}
+    np.testing.assert_array_equal(arrays["lattice"], lattice)
+    np.testing.assert_array_equal(arrays["series"], series)
+    assert arrays["empty"].shape == (0,)
+
+
+def test_load_rejects_foreign_file(tmp_path):
+    path = tmp_path / "other.ckpt"
+    path.write_bytes(b"not a checkpoint")
+    with pytest.raises(ValueError):
+        load_checkpoint(str(path))
+
+
+def test_interrupted_point_resumes_to_the_same_result(tmp_path, monkeypatch):
+    args = (2.2, np.random.SeedSequence(7), 8, 1.0, 0.0, 1500, 2500, "metropolis")
+    expected = _measure_temperature(*args)
+
+    # прерываем измерение после трёх блоков, каждый из которых сохраняется
+    sample_series = ising_model._sample_series
+    blocks = []
+
+    def interrupted(*sample_args):
+        if len(blocks) == 3:
+            raise Interrupted()
+        blocks.append(1)
+        return sample_series(*sample_args)
+
+    path = str(tmp_path / "point.ckpt")
+    monkeypatch.setattr(ising_model, "_sample_series", interrupted)
+    with pytest.raises(Interrupted):
+        _measure_temperature(*args, checkpoint=path, checkpoint_interval=0.0)
+    header, _ = load_checkpoint(path)
+    assert header["done"] == 3000
+
+    monkeypatch.setattr(ising_model, "_sample_series", sample_series)
+    assert _measure_temperature(*args, checkpoint=path, checkpoint_interval=0.0) == expected
+
+
+def test_cancelled_scan_resumes_from_checkpoint(tmp_path):
+    expected = scan_temperature_ferromagnetic(**SCAN, n_workers=1)
+    path = str(tmp_path / "scan.ckpt")
+
+    finished = []
+    with pytest.raises(ScanCancelled):
+        scan_temperature_ferromagnetic(
+            **SCAN, n_workers=1, checkpoint_path=path, on_point=finished.append,
+            should_stop=lambda: len(finished) == 2,
+        )
+    header, _ = load_checkpoint(path)
+    assert sorted(header["points"]) == ["0", "1"]
+
+    # законченные точки не пересчитываются и снова сообщаются через on_point
+    resumed = []
+    result = scan_temperature_ferromagnetic(**SCAN, n_workers=1, checkpoint_path=path, on_point=resumed.append)
+    assert result == expected
+    assert resumed[:2] == finished
+    assert glob.glob(path + "*") == []
+
+
+def test_point_files_survive_until_first_finished_point(tmp_path):
+    path = str(tmp_path / "scan.ckpt")
+    checkpoint = ScanCheckpoint(path, {"seed": 1})
+    save_checkpoint(checkpoint.point_path("0"), {"done": 10}, {})
+
+    # перезапуск с теми же параметрами сохраняет файл незаконченной точки
+    checkpoint = ScanCheckpoint(path, {"seed": 1})
+    assert load_checkpoint(checkpoint.point_path("0"))[0] == {"done": 10}
+    checkpoint.record("0", {"temperature": 2.0})
+    assert glob.glob(path + ".*") == []
+    assert ScanCheckpoint(path, {"seed": 1}).get("0") == {"temperature": 2.0}
+
+
+def test_point_files_are_kept_without_main_file(tmp_path):
+    path = str(tmp_path / "scan.ckpt")
+    save_checkpoint(path + ".3", {"done": 10}, {})
+    ScanCheckpoint(path, {"seed": 1})
+    assert load_checkpoint(path + ".3")[0] == {"done": 10}
+
+
+def test_other_parameters_discard_checkpoint(tmp_path):
+    path = str(tmp_path / "scan.ckpt")
+    checkpoint = ScanCheckpoint(path, {"seed": 1})
+    checkpoint.record("0", {"temperature": 2.0})
+    save_checkpoint(checkpoint.point_path("1"), {"done": 10}, {})
+
+    checkpoint = ScanCheckpoint(path, {"seed": 2})
+    assert checkpoint.get("0") is None
+    assert glob.glob(path + ".*") == []
@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+from domain import DomainDecomposedIsing2D, scan_large_lattice
+
+SCAN = dict(size=40, T_min=2.0, T_max=2.6, T_steps=3, equilibration_sweeps=10, measurement_sweeps=10, seed=3)
+
+
+def test_sweeps_track_totals():
+    with DomainDecomposedIsing2D(size=36, T=2.3, B=0.1, seed=1, n_workers=3) as model:
+        model.run_sweeps(5)
+        s = model.spins.astype(np.int64)
+        M = int(s.sum())
+        bonds = int(np.sum(s * np.roll(s, -1, axis=0)) + np.sum(s * np.roll(s, -1, axis=1)))
+        assert model.total_magnetization() == M
+        assert model.calculate_energy() == pytest.approx(-model.J * bonds - model.B * M)
+
+
+def test_seeded_scan_does_not_depend_on_worker_count():
+    # размер 40 не кратен ROW_BLOCK: последний блок короче остальных
+    expected = scan_large_lattice(**SCAN, n_workers=1)
+    for n_workers in (2, 3):
+        assert scan_large_lattice(**SCAN, n_workers=n_workers) == expected
+
+
+def test_odd_size_is_rejected():
+    with pytest.raises(ValueError):
+        DomainDecomposedIsing2D(size=33, n_workers=1)
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from ising_model import IsingModel2D
+
+
+def full_totals(spins):
+    # M и сумма связей полным пересчётом по решетке
+    s = np.asarray(spins, dtype=np.int64)
+    return int(s.sum()), int(np.sum(s * np.roll(s, -1, axis=0)) + np.sum(s * np.roll(s, -1, axis=1)))
+
+
+def assert_totals(model):
+    M, bonds = full_totals(model.spins)
+    assert model.total_magnetization() == M
+    assert model.calculate_energy() == pytest.approx(-model.J * bonds - model.B * M)
+
+
+@pytest.mark.parametrize("B", [0.0, 0.3])
+def test_metropolis_step_tracks_totals(B):
+    model = IsingModel2D(size=12, T=2.0, B=B, seed=1)
+    for _ in range(2000):
+        model.metropolis_step()
+    assert_totals(model)
+
+
+def test_run_metropolis_trace_matches_recomputation():
+    model = IsingModel2D(size=10, T=2.3, seed=2)
+    for _ in range(100):
+        _, m_trace, bond_trace = model.run_metropolis(7, trace=True)
+        assert (m_trace[-1], bond_trace[-1]) == full_totals(model.spins)
+        # за шаг переворачивается не больше одного спина
+        assert set(np.abs(np.diff(m_trace)).tolist()) <= {0, 2}
+    assert_totals(model)
+
+
+@pytest.mark.parametrize("size", [8, 9])
+def test_sweep_tracks_totals(size):
+    # при нечётном размере подрешетки на шве соседствуют, проверяем и его
+    model = IsingModel2D(size=size, T=2.5, B=0.1, seed=3)
+    for _ in range(50):
+        model.sweep()
+        assert_totals(model)
+
+
+def test_flip_spin_tracks_totals():
+    model = IsingModel2D(size=6, seed=4)
+    rng = np.random.default_rng(5)
+    for i, j in rng.integers(0, 6, size=(100, 2)):
+        model.flip_spin(int(i), int(j))
+    assert_totals(model)
+
+
+def test_set_spins_recomputes_totals():
+    model = IsingModel2D(size=4, seed=6)
+    spins = np.ones((5, 5), dtype=int)
+    spins[2, 3] = -1
+    model.set_spins(spins.tolist())
+    assert_totals(model)
+
+
+@pytest.mark.parametrize("i, j", [(-1, 0), (0, 6), (6, 6)])
+def test_flip_spin_rejects_outside_sites(i, j):
+    model = IsingModel2D(size=6, seed=7)
+    before = model.spins.copy()
+    with pytest.raises(IndexError):
+        model.flip_spin(i, j)
+    np.testing.assert_array_equal(model.spins, before)
+
+
+@pytest.mark.parametrize("algorithm", ["wolff", "swendsen_wang"])
+@pytest.mark.parametrize("B", [0.0, 0.2])
+def test_cluster_updates_track_totals(algorithm, B):
+    model = IsingModel2D(size=10, T=2.2, B=B, seed=8)
+    for _ in range(30):
+        model.update(algorithm)
+        assert_totals(model)
+
+
+def test_update_rejects_unknown_algorithm():
+    with pytest.raises(ValueError):
+        IsingModel2D(size=4, seed=9).update("heat_bath")
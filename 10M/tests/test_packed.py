@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from ising_model import IsingModel2D
+from packed import PackedIsingModel2D, pack_spins, unpack_spins
+
+
+def pair(size, **kwargs):
+    # одинаковый seed дает одинаковую начальную решетку и те же случайные числа
+    return IsingModel2D(size=size, seed=11, **kwargs), PackedIsingModel2D(size=size, seed=11, **kwargs)
+
+
+def assert_same(plain, packed):
+    np.testing.assert_array_equal(packed.spins, plain.spins)
+    assert packed.total_magnetization() == plain.total_magnetization()
+    assert packed.calculate_energy() == plain.calculate_energy()
+
+
+@pytest.mark.parametrize("size", [5, 64, 70, 130])
+def test_pack_unpack_round_trip(size):
+    spins = np.random.default_rng(size).choice(np.array([-1, 1], dtype=np.int8), size=(size, size))
+    words = pack_spins(spins)
+    assert words.shape == (size, (size + 63) // 64)
+    np.testing.assert_array_equal(unpack_spins(words, size), spins)
+
+
+@pytest.mark.parametrize("size", [5, 64, 70])
+def test_totals_match_int8(size):
+    plain, packed = pair(size)
+    assert_same(plain, packed)
+
+
+@pytest.mark.parametrize("size", [7, 70])
+def test_metropolis_matches_int8(size):
+    plain, packed = pair(size, T=2.3, B=0.1)
+    for _ in range(3000):
+        assert packed.metropolis_step() == plain.metropolis_step()
+    assert_same(plain, packed)
+
+
+def test_run_metropolis_matches_int8():
+    plain, packed = pair(20, T=2.0)
+    assert packed.run_metropolis(5000)[0] == plain.run_metropolis(5000)[0]
+    assert_same(plain, packed)
+
+
+@pytest.mark.parametrize("size", [64, 128])
+def test_sweep_matches_int8(size):
+    # при размере, кратном 64, упакованный проход берет столько же случайных чисел
+    plain, packed = pair(size, T=2.4, B=0.05)
+    for _ in range(10):
+        assert packed.sweep() == plain.sweep()
+    assert_same(plain, packed)
+
+
+@pytest.mark.parametrize("size", [6, 70])
+def test_sweep_tracks_totals(size):
+    _, packed = pair(size, T=2.4)
+    for _ in range(10):
+        packed.sweep()
+    reference = IsingModel2D(size=size)
+    reference.set_spins(packed.spins.tolist())
+    assert packed.total_magnetization() == reference.total_magnetization()
+    assert packed.calculate_energy() == reference.calculate_energy()
+
+
+@pytest.mark.parametrize("algorithm", ["wolff", "swendsen_wang"])
+def test_cluster_updates_match_int8(algorithm):
+    plain, packed = pair(12, T=2.2)
+    for _ in range(20):
+        assert packed.update(algorithm) == plain.update(algorithm)
+    assert_same(plain, packed)
+
+
+def test_flip_spin_and_local_energy_match_int8():
+    plain, packed = pair(70, B=0.2)
+    for i, j in [(0, 0), (0, 63), (0, 64), (69, 69), (35, 1)]:
+        assert packed.local_energy(i, j) == plain.local_energy(i, j)
+        plain.flip_spin(i, j)
+        packed.flip_spin(i, j)
+        assert_same(plain, packed)
+
+
+@pytest.mark.parametrize("i, j", [(-1, 3), (3, -1), (70, 0), (0, 70), (0, 127)])
+def test_flip_spin_rejects_outside_sites(i, j):
+    _, packed = pair(70)
+    words = packed.words.copy()
+    with pytest.raises(IndexError):
+        packed.flip_spin(i, j)
+    np.testing.assert_array_equal(packed.words, words)
@@ -0,0 +1,72 @@
+import pytest
+
+import result_cache
+from result_cache import ResultCache, cache_key
+
+
+def scan(calls):
+    def run(size, seed, **runtime):
+        calls.append((size, seed, runtime))
+        return {"temperatures": [1.0, 2.0], "M_abs_avg": [0.9, 0.1], "reweighted": {"heat_capacity": [0.5]}}
+
+    return run
+
+
+def test_cache_key_ignores_parameter_order():
+    assert cache_key("scan", {"size": 10, "seed": 1}) == cache_key("scan", {"seed": 1, "size": 10})
+
+
+@pytest.mark.parametrize(
+    "kind, params",
+    [
+        ("scan", {"size": 10, "seed": 2}),
+        ("scan", {"size": 12, "seed": 1}),
+        ("critical", {"size": 10, "seed": 1}),
+    ],
+)
+def test_cache_key_depends_on_kind_and_params(kind, params):
+    assert cache_key(kind, params) != cache_key("scan", {"size": 10, "seed": 1})
+
+
+def test_cache_key_depends_on_algorithm_version(monkeypatch):
+    before = cache_key("scan", {"size": 10})
+    monkeypatch.setattr(result_cache, "ALGORITHM_VERSION", result_cache.ALGORITHM_VERSION + 1)
+    assert cache_key("scan", {"size": 10}) != before
+
+
+def test_runtime_arguments_are_not_part_of_the_key():
+    cache = ResultCache()
+    calls = []
+    first = cache.cached("scan", scan(calls), reuse=True)(size=10, seed=1, n_workers=1)
+    second = cache.cached("scan", scan(calls), reuse=True)(
+        size=10, seed=1, n_workers=4, on_point=print, checkpoint_path="/tmp/x.ckpt"
+    )
+    assert len(calls) == 1
+    assert second == first
+
+
+def test_without_reuse_result_is_recomputed_and_stored():
+    cache = ResultCache()
+    calls = []
+    cache.cached("scan", scan(calls), reuse=False)(size=10, seed=None)
+    cache.cached("scan", scan(calls), reuse=False)(size=10, seed=None)
+    assert len(calls) == 2
+    cache.cached("scan", scan(calls), reuse=True)(size=10, seed=None)
+    assert len(calls) == 2
+
+
+def test_disk_level_is_shared_between_caches(tmp_path):
+    calls = []
+    result = ResultCache(directory=str(tmp_path)).cached("scan", scan(calls), reuse=True)(size=8, seed=3)
+    other = ResultCache(directory=str(tmp_path))
+    assert other.cached("scan", scan(calls), reuse=True)(size=8, seed=3) == result
+    assert len(calls) == 1
+    assert other.stats()["disk_hits"] == 1
+
+
+def test_disk_eviction_keeps_size_bound(tmp_path):
+    cache = ResultCache(directory=str(tmp_path), max_entries=1, max_disk_bytes=1)
+    cache.put("a", {"values": [1.0]})
+    cache.put("b", {"values": [2.0]})
+    assert cache.stats()["disk_entries"] <= 1
+    assert cache.get("a") is None
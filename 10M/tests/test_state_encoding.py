@@ -0,0 +1,84 @@
+import base64
+
+import numpy as np
+import pytest
+
+from ising_model import IsingModel2D, changed_sites, pack_lattice
+from packed import PackedIsingModel2D
+
+
+def decode(state, n_sites):
+    # спины кадра packed как в клиенте: построчно, старший бит первым
+    bits = np.unpackbits(np.frombuffer(base64.b64decode(state["spins_packed"]), dtype=np.uint8))
+    return bits[:n_sites].astype(bool)
+
+
+def apply_delta(bits, state):
+    bits = bits.copy()
+    bits[state["changed"]] ^= True
+    return bits
+
+
+@pytest.mark.parametrize("model_class", [IsingModel2D, PackedIsingModel2D])
+def test_delta_round_trip(model_class):
+    model = model_class(size=30, T=1.5, seed=21)
+    n_sites = 30 * 30
+    state = model.get_state("packed")
+    bits = decode(state, n_sites)
+    np.testing.assert_array_equal(bits, model.spins.ravel() > 0)
+
+    for _ in range(5):
+        base_version = state["version"]
+        model.run_steps(40)
+        state = model.get_state("delta", since_version=base_version)
+        assert state["encoding"] == "delta"
+        assert state["base_version"] == base_version
+        assert state["version"] == model.version
+        bits = apply_delta(bits, state)
+        np.testing.assert_array_equal(bits, model.spins.ravel() > 0)
+
+
+def test_delta_without_changes_is_empty():
+    model = IsingModel2D(size=10, seed=22)
+    version = model.get_state("packed")["version"]
+    state = model.get_state("delta", since_version=version)
+    assert state["encoding"] == "delta"
+    assert state["changed"] == []
+
+
+def test_many_changes_fall_back_to_packed():
+    model = IsingModel2D(size=20, T=5.0, seed=23)
+    version = model.get_state("packed")["version"]
+    model.run_sweeps(3)
+    state = model.get_state("delta", since_version=version)
+    assert state["encoding"] == "packed"
+    assert "changed" not in state
+    np.testing.assert_array_equal(decode(state, 400), model.spins.ravel() > 0)
+
+
+@pytest.mark.parametrize("since_version", [None, 999])
+def test_unknown_base_version_sends_full_frame(since_version):
+    model = IsingModel2D(size=10, seed=24)
+    model.get_state("packed")
+    model.flip_spin(0, 0)
+    state = model.get_state("delta", since_version=since_version)
+    assert state["encoding"] == "packed"
+
+
+def test_evicted_snapshot_sends_full_frame():
+    model = IsingModel2D(size=10, seed=25)
+    first = model.get_state("packed")["version"]
+    for k in range(20):
+        model.flip_spin(k % 10, 0)
+        model.get_state("packed")
+    assert model.get_state("delta", since_version=first)["encoding"] == "packed"
+
+
+def test_changed_sites_ignores_padding_bits():
+    spins = -np.ones((3, 3), dtype=np.int8)
+    old = pack_lattice(spins)
+    spins[1, 2] = 1
+    # последний байт дополнен нулями: посторонний бит за решеткой не в счет
+    new = bytearray(pack_lattice(spins))
+    new[-1] |= 0x01
+    np.testing.assert_array_equal(changed_sites(old, bytes(new), 9), [5])
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from ising_model import IsingModel2D, _sublattice_masks
+
+
+@pytest.mark.parametrize("size", [2, 3, 8, 9, 15])
+def test_sublattices_partition_lattice_without_neighbours(size):
+    masks = _sublattice_masks(size)
+    np.testing.assert_array_equal(np.sum(masks, axis=0), 1)
+    for mask in masks:
+        for axis in (0, 1):
+            assert not np.any(mask & np.roll(mask, 1, axis=axis))
+
+
+def test_cold_ordered_lattice_stays_ordered():
+    model = IsingModel2D(size=10, T=0.5, seed=31)
+    model.set_spins(np.ones((10, 10), dtype=int).tolist())
+    accepted, spins = model.run_sweeps(20)
+    assert accepted == 0
+    assert np.all(np.array(spins) == 1)
+
+
+def test_hot_lattice_loses_order():
+    model = IsingModel2D(size=32, T=50.0, seed=32)
+    model.set_spins(np.ones((32, 32), dtype=int).tolist())
+    model.run_sweeps(50)
+    assert abs(model.calculate_magnetization()) < 0.2
+
+
+def test_run_sweeps_bumps_version_once():
+    model = IsingModel2D(size=8, seed=33)
+    version = model.version
+    model.run_sweeps(5)
+    assert model.version == version + 1
+
+
+def test_sweeps_are_reproducible_with_seed():
+    first = IsingModel2D(size=12, T=2.3, seed=34).run_sweeps(10)
+    second = IsingModel2D(size=12, T=2.3, seed=34).run_sweeps(10)
+    assert first == second
@@ -0,0 +1,62 @@
+import math
+
+from pendulum import Pendulum
+
+
+def angle_zero(t, angle, angular_velocity):
+    return angle
+
+
+def turning_point(t, angle, angular_velocity):
+    return angular_velocity
+
+
+def analyze_oscillation(pend: Pendulum, n_periods: int = 5, dt: float = 0.05, max_time: float = 50.0) -> dict:
+    # period from n_periods downward zero crossings, amplitudes at turning points;
+    # crossings are located inside the step, so dt does not affect timing
+    crossings = pend.add_event(angle_zero, direction=-1, name="angle_zero")
+    turns = pend.add_event(turning_point, direction=0, name="turning_point")
+    try:
+        while pend.t_elapsed < max_time and len(crossings.times) < n_periods:
+            pend.update(dt)
+    finally:
+        pend.remove_event(crossings)
+        pend.remove_event(turns)
+
+    times = crossings.times[:n_periods]
+    periods = [b - a for a, b in zip(times, times[1:])]
+    period = (times[-1] - times[0]) / (n_periods - 1) if len(times) == n_periods else float("nan")
+
+    amplitudes = [abs(state[0]) for state in turns.states]
+    amplitude_times = list(turns.times)
+    return {
+        "period": period,
+        "periods": periods,
+        "crossing_times": times,
+        "amplitudes": amplitudes,
+        "amplitude_times": amplitude_times,
+        "decay_rate": _decay_rate(amplitude_times, amplitudes),
+        "log_decrement": _log_decrement(amplitudes),
+    }
+
+
+def _decay_rate(times, amplitudes):
+    # least-squares slope of ln A(t): A ~ exp(-rate * t) for linear damping
+    points = [(t, math.log(a)) for t, a in zip(times, amplitudes) if a > 0]
+    if len(points) < 2:
+        return float("nan")
+    t_mean = sum(t for t, _ in points) / len(points)
+    y_mean = sum(y for _, y in points) / len(points)
+    sxx = sum((t - t_mean) ** 2 for t, _ in points)
+    if sxx == 0:
+        return float("nan")
+    sxy = sum((t - t_mean) * (y - y_mean) for t, y in points)
+    return -sxy / sxx
+
+
+def _log_decrement(amplitudes):
+    # mean ln(A_k / A_{k+2}) over turning points one full period apart
+    ratios = [math.log(a / b) for a, b in zip(amplitudes, amplitudes[2:]) if a > 0 and b > 0]
+    if not ratios:
+        return float("nan")
+    return sum(ratios) / len(ratios)
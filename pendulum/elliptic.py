@@ -0,0 +1,43 @@
+import math
+from functools import lru_cache
+
+import numpy as np
+
+# Complete elliptic integral K(m) and Jacobi functions sn, cn, dn with
+# parameter m = k**2, both from the arithmetic-geometric mean (Abramowitz &
+# Stegun 17.6 and 16.4). The AGM sequence depends only on m, so it is
+# computed once per amplitude and reused for every time value.
+
+
+@lru_cache(maxsize=256)
+def agm_sequence(m):
+    # (a_n, c_n) of the descending Landen/AGM iteration
+    if not 0.0 <= m < 1.0:
+        raise ValueError("Elliptic parameter must satisfy 0 <= m < 1")
+    a, b, c = 1.0, math.sqrt(1.0 - m), math.sqrt(m)
+    a_seq, c_seq = [a], [c]
+    while abs(c) > 1e-16 * a and len(a_seq) < 64:
+        a, b, c = 0.5 * (a + b), math.sqrt(a * b), 0.5 * (a - b)
+        a_seq.append(a)
+        c_seq.append(c)
+    return tuple(a_seq), tuple(c_seq)
+
+
+def ellipk(m):
+    a_seq, _ = agm_sequence(m)
+    return math.pi / (2.0 * a_seq[-1])
+
+
+def ellipj(u, m):
+    # u may be a scalar or an array
+    a_seq, c_seq = agm_sequence(m)
+    n = len(a_seq) - 1
+    phi = (2.0**n) * a_seq[-1] * np.asarray(u, dtype=float)
+    phi_next = phi
+    for k in range(n, 0, -1):
+        phi_next = phi
+        phi = 0.5 * (phi + np.arcsin(c_seq[k] / a_seq[k] * np.sin(phi)))
+    sn = np.sin(phi)
+    cn = np.cos(phi)
+    dn = cn / np.cos(phi_next - phi) if n > 0 else np.ones_like(phi)
+    return sn, cn, dn
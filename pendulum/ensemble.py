@@ -0,0 +1,138 @@
+import numpy as np
+
+from pendulum import EPS, SHAPE_INERTIA
+
+
+def _crossing_fraction(angle0, velocity0, angle1, velocity1, dt, iterations=4):
+    # root s in [0, 1] of the cubic Hermite interpolant of the angle over one
+    # step, by Newton iterations from the linear interpolation
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s = np.clip(np.nan_to_num(angle0 / (angle0 - angle1)), 0.0, 1.0)
+        for _ in range(iterations):
+            value = (
+                (1 + 2 * s) * (1 - s) ** 2 * angle0
+                + s * (1 - s) ** 2 * dt * velocity0
+                + s * s * (3 - 2 * s) * angle1
+                + s * s * (s - 1) * dt * velocity1
+            )
+            slope = (
+                6 * s * (s - 1) * (angle0 - angle1)
+                + (1 - s) * (1 - 3 * s) * dt * velocity0
+                + s * (3 * s - 2) * dt * velocity1
+            )
+            s = np.clip(np.nan_to_num(s - value / slope), 0.0, 1.0)
+    return s
+
+
+class PendulumEnsemble:
+    # independent pendulums stepped together; parameters broadcast to one shape,
+    # each element uses the same scheme as Pendulum.update
+
+    def __init__(
+        self,
+        length=1.0,
+        mass=1.0,
+        angle=0.5,
+        angular_velocity=0.0,
+        gravity=9.81,
+        damping=0.01,
+        shape="point",
+        bob_size=0.05,
+    ):
+        factors = np.vectorize(lambda s: SHAPE_INERTIA.get(s, 0.0), otypes=[float])(shape)
+        (
+            self.length,
+            self.mass,
+            self.angle,
+            self.angular_velocity,
+            self.gravity,
+            self.damping,
+            self.shape_factor,
+            self.bob_size,
+        ) = (
+            np.array(a, dtype=float)
+            for a in np.broadcast_arrays(
+                length, mass, angle, angular_velocity, gravity, damping, factors, bob_size
+            )
+        )
+
+        self.t_elapsed = 0.0
+        self.initial_angle = self.angle.copy()
+        self.recompute_inertia()
+        self.initial_energy = self.energy()
+
+    def __len__(self):
+        return self.angle.size
+
+    def recompute_inertia(self):
+        size = np.maximum(EPS, self.bob_size)
+        self.I_cm = self.shape_factor * self.mass * size * size
+        self.I_total = np.maximum(EPS, self.I_cm + self.mass * self.length**2)
+        # gravity torque coefficient: angular acceleration = -stiffness * sin(angle)
+        self.stiffness = self.mass * self.gravity * self.length / self.I_total
+        self.conservative = np.abs(self.damping) < EPS
+
+    def energy(self):
+        kinetic = 0.5 * self.I_total * self.angular_velocity**2
+        potential = self.mass * self.gravity * self.length * (1 - np.cos(self.angle))
+        return kinetic + potential
+
+    def energy_deviation(self):
+        # relative deviation from the initial energy, 0 where it is zero
+        initial = np.where(self.initial_energy > 0, self.initial_energy, 1.0)
+        return np.where(self.initial_energy > 0, np.abs(self.energy() - self.initial_energy) / initial, 0.0)
+
+    def _verlet(self, dt):
+        acc = -self.stiffness * np.sin(self.angle)
+        angle = self.angle + self.angular_velocity * dt + 0.5 * acc * dt * dt
+        acc_new = -self.stiffness * np.sin(angle)
+        return angle, self.angular_velocity + 0.5 * (acc + acc_new) * dt
+
+    def _damped(self, dt):
+        velocity = (self.angular_velocity - self.stiffness * np.sin(self.angle) * dt) * np.exp(
+            -self.damping * dt
+        )
+        return self.angle + velocity * dt, velocity
+
+    def update(self, dt=0.005):
+        if dt <= 0:
+            return
+
+        if self.conservative.all():
+            self.angle, self.angular_velocity = self._verlet(dt)
+        elif not self.conservative.any():
+            self.angle, self.angular_velocity = self._damped(dt)
+        else:
+            verlet = self._verlet(dt)
+            damped = self._damped(dt)
+            self.angle = np.where(self.conservative, verlet[0], damped[0])
+            self.angular_velocity = np.where(self.conservative, verlet[1], damped[1])
+
+        self.t_elapsed += dt
+
+    def run(self, dt, n_steps):
+        for _ in range(n_steps):
+            self.update(dt)
+
+    def measure_periods(self, dt, n_periods=5, max_time=50.0):
+        # period from downward zero crossings interpolated inside the step;
+        # NaN where fewer than n_periods crossings before max_time
+        counts = np.zeros(self.angle.shape, dtype=int)
+        t_first = np.full(self.angle.shape, np.nan)
+        t_last = np.full(self.angle.shape, np.nan)
+        prev_angle, prev_velocity = self.angle, self.angular_velocity
+
+        while self.t_elapsed < max_time and (counts < n_periods).any():
+            self.update(dt)
+            crossed = (prev_angle > 0) & (self.angle <= 0) & (self.angular_velocity < 0) & (counts < n_periods)
+            if crossed.any():
+                # crossing time inside the step, as Pendulum events locate it
+                t_cross = self.t_elapsed - dt + dt * _crossing_fraction(
+                    prev_angle, prev_velocity, self.angle, self.angular_velocity, dt
+                )
+                counts += crossed
+                t_first = np.where(crossed & (counts == 1), t_cross, t_first)
+                t_last = np.where(crossed & (counts == n_periods), t_cross, t_last)
+            prev_angle, prev_velocity = self.angle, self.angular_velocity
+
+        return (t_last - t_first) / (n_periods - 1)
@@ -0,0 +1,111 @@
+import math
+from array import array
+
+
+class _Level:
+    # fixed-size ring of buckets: start time, min, max and mean of each bucket
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.time = array("d", [0.0]) * capacity
+        self.min = array("d", [0.0]) * capacity
+        self.max = array("d", [0.0]) * capacity
+        self.mean = array("d", [0.0]) * capacity
+        self.count = 0
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def push(self, t, lo, hi, mean):
+        i = self.count % self.capacity
+        self.time[i] = t
+        self.min[i] = lo
+        self.max[i] = hi
+        self.mean[i] = mean
+        self.count += 1
+
+    def ordered(self, column):
+        # oldest to newest
+        data = getattr(self, column)
+        if self.count <= self.capacity:
+            return data[: self.count].tolist()
+        start = self.count % self.capacity
+        return (data[start:] + data[:start]).tolist()
+
+
+class EnergyHistory:
+    # level k keeps the last capacity buckets of factor**k samples (min/max/mean);
+    # a coarse bucket appears only once complete
+
+    def __init__(self, capacity=1024, factor=16, levels=4):
+        self.capacity = capacity
+        self.factor = factor
+        self.levels = [_Level(capacity) for _ in range(levels)]
+        # partially filled bucket of every level above 0: [t0, min, max, sum, n]
+        self._pending = [None] * levels
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, t, value):
+        self.count += 1
+        self.levels[0].push(t, value, value, value)
+        bucket = (t, value, value, value)
+        for k in range(1, len(self.levels)):
+            bucket = self._accumulate(k, bucket)
+            if bucket is None:
+                break
+
+    def _accumulate(self, k, bucket):
+        # add a finished bucket of level k - 1; returns the finished bucket of level k
+        t, lo, hi, mean = bucket
+        pending = self._pending[k]
+        if pending is None:
+            pending = self._pending[k] = [t, lo, hi, 0.0, 0]
+        pending[1] = min(pending[1], lo)
+        pending[2] = max(pending[2], hi)
+        pending[3] += mean
+        pending[4] += 1
+        if pending[4] < self.factor:
+            return None
+        finished = (pending[0], pending[1], pending[2], pending[3] / pending[4])
+        self.levels[k].push(*finished)
+        self._pending[k] = None
+        return finished
+
+    def select_level(self, points):
+        # finest level that still holds the whole history; query merges its
+        # buckets by stride down to the point budget
+        for k, level in enumerate(self.levels):
+            if level.count <= level.capacity:
+                return k
+        return len(self.levels) - 1
+
+    def query(self, points=500, level=None):
+        if level is None:
+            level = self.select_level(points)
+        level = max(0, min(len(self.levels) - 1, level))
+        data = self.levels[level]
+        time = data.ordered("time")
+        lo = data.ordered("min")
+        hi = data.ordered("max")
+        mean = data.ordered("mean")
+
+        # merge neighbouring buckets if the level still has too many
+        stride = max(1, math.ceil(len(time) / max(1, points)))
+        if stride > 1:
+            chunks = range(0, len(time), stride)
+            time = [time[i] for i in chunks]
+            lo = [min(lo[i : i + stride]) for i in chunks]
+            hi = [max(hi[i : i + stride]) for i in chunks]
+            mean = [sum(mean[i : i + stride]) / len(mean[i : i + stride]) for i in chunks]
+
+        return {
+            "level": level,
+            "samplesPerPoint": self.factor**level * stride,
+            "totalSamples": self.count,
+            "time": time,
+            "min": lo,
+            "max": hi,
+            "mean": mean,
+        }
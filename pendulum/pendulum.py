@@ -3,8 +3,63 @@ import json
 from http.server import HTTPServer, BaseHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
 
+import numpy as np
+
+from elliptic import ellipj, ellipk
+from history import EnergyHistory
+
 EPS = 1e-12
 
+# moment of inertia about the centre of mass, in units of mass * bob_size**2
+SHAPE_INERTIA = {"point": 0.0, "disk": 0.5, "sphere": 0.4, "rod": 1.0 / 12.0}
+
+# auto keeps the original choice: Velocity-Verlet without damping,
+# semi-implicit Euler with exponential damping otherwise
+INTEGRATORS = ("auto", "verlet", "semi_implicit", "rk4", "yoshida4", "dopri5")
+
+# Yoshida triple jump: three Verlet substeps with these weights are 4th order
+_CBRT2 = 2.0 ** (1.0 / 3.0)
+YOSHIDA_WEIGHTS = (1.0 / (2.0 - _CBRT2), -_CBRT2 / (2.0 - _CBRT2), 1.0 / (2.0 - _CBRT2))
+
+# Dormand-Prince 5(4) tableau; the last row equals the 5th-order weights
+# (first same as last: the 7th stage is the derivative at the new point)
+DOPRI_A = (
+    (),
+    (1.0 / 5.0,),
+    (3.0 / 40.0, 9.0 / 40.0),
+    (44.0 / 45.0, -56.0 / 15.0, 32.0 / 9.0),
+    (19372.0 / 6561.0, -25360.0 / 2187.0, 64448.0 / 6561.0, -212.0 / 729.0),
+    (9017.0 / 3168.0, -355.0 / 33.0, 46732.0 / 5247.0, 49.0 / 176.0, -5103.0 / 18656.0),
+    (35.0 / 384.0, 0.0, 500.0 / 1113.0, 125.0 / 192.0, -2187.0 / 6784.0, 11.0 / 84.0),
+)
+# difference between the 5th- and 4th-order solutions
+DOPRI_E = (71.0 / 57600.0, 0.0, -71.0 / 16695.0, 71.0 / 1920.0, -17253.0 / 339200.0, 22.0 / 525.0, -1.0 / 40.0)
+# continuous extension of Dormand-Prince (Hairer, Norsett & Wanner)
+DOPRI_D = (
+    -12715105075.0 / 11282082432.0,
+    0.0,
+    87487479700.0 / 32700410799.0,
+    -10690763975.0 / 1880347072.0,
+    701980252875.0 / 199316789632.0,
+    -1453857185.0 / 822651844.0,
+    69997945.0 / 29380423.0,
+)
+
+
+class Event:
+    # zero crossings of func(t, angle, angular_velocity) located from dense output;
+    # direction > 0 rising only, < 0 falling only, 0 both
+
+    def __init__(self, func, direction=0, name=None):
+        self.func = func
+        self.direction = direction
+        self.name = name or getattr(func, "__name__", "event")
+        self.times = []
+        self.states = []
+        # time and value of the last check
+        self._t = None
+        self._value = None
+
 
 class Pendulum:
     def __init__(
@@ -17,7 +72,11 @@ class Pendulum:
         damping=0.01,
         shape="point",
         bob_size=0.05,
+        integrator="auto",
+        tolerance=1e-8,
     ):
+        if integrator not in INTEGRATORS:
+            raise ValueError(f"Unknown integrator: {integrator}")
         self.length = length
         self.mass = mass
         self.angle = angle
@@ -26,8 +85,20 @@ class Pendulum:
         self.damping = damping
         self.shape = shape
         self.bob_size = bob_size
+        self.integrator = integrator
+        # relative and absolute error per step for dopri5
+        self.tolerance = tolerance
 
         self.t_elapsed = 0.0
+        self.force_evaluations = 0
+        # dopri5: step size, derivative at the front (reused as k1) and the
+        # front itself as (t, state, state reported at t_elapsed)
+        self._step_size = None
+        self._fsal = None
+        self._front = None
+        # last step for dense output: (t0, h, coefficients)
+        self._dense = None
+        self.events = []
         self.initial_angle = angle
         self.I_cm = self._compute_I_cm()
         self.I_total = max(EPS, self.I_cm + self.mass * (self.length**2))
@@ -36,23 +107,18 @@ class Pendulum:
         self.last_energy = self.initial_energy
         self.energy_violation = 0.0
         self.energy_tolerance = 0.02
-        self.energy_history = [self.initial_energy]
+        # bounded: the server advances the pendulum on every poll for as long as it runs
+        self.energy_history = EnergyHistory()
+        self.energy_history.append(self.t_elapsed, self.initial_energy)
         self.max_rel_energy_deviation = 0.0
 
     def _compute_I_cm(self):
-        if self.shape == "point":
-            return 0.0
-        elif self.shape == "disk":
-            r = max(EPS, self.bob_size)
-            return 0.5 * self.mass * r * r
-        elif self.shape == "sphere":
-            r = max(EPS, self.bob_size)
-            return 0.4 * self.mass * r * r
-        elif self.shape == "rod":
-            Lrod = max(EPS, self.bob_size)
-            return (1.0 / 12.0) * self.mass * (Lrod**2)
-        else:
+        # bob_size is the radius for disk/sphere and the length for rod
+        factor = SHAPE_INERTIA.get(self.shape, 0.0)
+        if factor == 0.0:
             return 0.0
+        size = max(EPS, self.bob_size)
+        return factor * self.mass * size * size
 
     def recompute_inertia(self):
         self.I_cm = self._compute_I_cm()
@@ -76,7 +142,7 @@ class Pendulum:
 
         self.energy_violation = rel_dev
         # record history and maximum deviation
-        self.energy_history.append(current_energy)
+        self.energy_history.append(self.t_elapsed, current_energy)
         if self.initial_energy > 0:
             self.max_rel_energy_deviation = max(self.max_rel_energy_deviation, rel_dev)
 
@@ -88,54 +154,249 @@ class Pendulum:
         angular_acc -= self.damping * self.angular_velocity
         return angular_acc
 
+    def derivative(self, angle, angular_velocity):
+        self.force_evaluations += 1
+        torque_gravity = -self.mass * self.gravity * self.length * math.sin(angle)
+        return angular_velocity, torque_gravity / self.I_total - self.damping * angular_velocity
+
     def update(self, dt=0.005):
         if dt <= 0:
             return
 
-        # Use Velocity-Verlet (symplectic) integrator for the conservative case (damping == 0)
-        if abs(self.damping) < EPS:
-            # acceleration at current angle
-            acc = (-self.mass * self.gravity * self.length * math.sin(self.angle)) / self.I_total
-            # theta half-step
-            theta_half = self.angle + self.angular_velocity * dt + 0.5 * acc * dt * dt
-            # compute acceleration at new angle
-            acc_new = (-self.mass * self.gravity * self.length * math.sin(theta_half)) / self.I_total
-            # velocity full step
-            self.angular_velocity = self.angular_velocity + 0.5 * (acc + acc_new) * dt
-            # position update
-            self.angle = theta_half
-        else:
-            # semi-implicit Euler with exponential damping factor for stability
-            torque_gravity = -self.mass * self.gravity * self.length * math.sin(self.angle)
-            angular_acc_gravity = torque_gravity / self.I_total
-
-            # integrate acceleration then apply damping
-            self.angular_velocity += angular_acc_gravity * dt
-            # model simple linear damping as multiplicative decay factor
-            self.angular_velocity *= math.exp(-self.damping * dt)
-            self.angle += self.angular_velocity * dt
+        integrator = self.integrator
+        if integrator == "auto":
+            integrator = "verlet" if abs(self.damping) < EPS else "semi_implicit"
 
-        self.t_elapsed += dt
+        if integrator == "dopri5":
+            self._advance_dopri5(dt)
+        else:
+            start = (self.angle, self.angular_velocity)
+            if integrator == "verlet":
+                self._step_verlet(dt)
+            elif integrator == "yoshida4":
+                for weight in YOSHIDA_WEIGHTS:
+                    self._step_verlet(weight * dt)
+            elif integrator == "rk4":
+                self._step_rk4(dt)
+            else:
+                self._step_semi_implicit(dt)
+            self._dense = (self.t_elapsed, dt, ["hermite", start, (self.angle, self.angular_velocity), None])
+            self.t_elapsed += dt
+            if self.events:
+                self._check_events(self.t_elapsed, (self.angle, self.angular_velocity))
 
         self.check_energy_conservation()
 
+    def _step_verlet(self, dt):
+        # Velocity-Verlet (symplectic) for the conservative part; damping, if
+        # any, is applied as exact exponential decay on both sides (Strang
+        # splitting), which keeps the step symmetric and 2nd order
+        decay = math.exp(-0.5 * self.damping * dt)
+        self.angular_velocity *= decay
+        # acceleration at current angle
+        acc = (-self.mass * self.gravity * self.length * math.sin(self.angle)) / self.I_total
+        # theta half-step
+        theta_half = self.angle + self.angular_velocity * dt + 0.5 * acc * dt * dt
+        # compute acceleration at new angle
+        acc_new = (-self.mass * self.gravity * self.length * math.sin(theta_half)) / self.I_total
+        # velocity full step
+        self.angular_velocity = self.angular_velocity + 0.5 * (acc + acc_new) * dt
+        # position update
+        self.angle = theta_half
+        self.angular_velocity *= decay
+        self.force_evaluations += 2
+
+    def _step_semi_implicit(self, dt):
+        # semi-implicit Euler with exponential damping factor for stability
+        torque_gravity = -self.mass * self.gravity * self.length * math.sin(self.angle)
+        angular_acc_gravity = torque_gravity / self.I_total
+
+        # integrate acceleration then apply damping
+        self.angular_velocity += angular_acc_gravity * dt
+        # model simple linear damping as multiplicative decay factor
+        self.angular_velocity *= math.exp(-self.damping * dt)
+        self.angle += self.angular_velocity * dt
+        self.force_evaluations += 1
+
+    def _step_rk4(self, dt):
+        theta, omega = self.angle, self.angular_velocity
+        k1 = self.derivative(theta, omega)
+        k2 = self.derivative(theta + 0.5 * dt * k1[0], omega + 0.5 * dt * k1[1])
+        k3 = self.derivative(theta + 0.5 * dt * k2[0], omega + 0.5 * dt * k2[1])
+        k4 = self.derivative(theta + dt * k3[0], omega + dt * k3[1])
+        self.angle = theta + dt / 6.0 * (k1[0] + 2.0 * k2[0] + 2.0 * k3[0] + k4[0])
+        self.angular_velocity = omega + dt / 6.0 * (k1[1] + 2.0 * k2[1] + 2.0 * k3[1] + k4[1])
+
+    def _dopri5_step(self, y, h):
+        # one trial step from state y; returns (new state, stages, error norm)
+        if self._fsal is not None and self._fsal[0] == y:
+            k = [self._fsal[1]]
+        else:
+            k = [self.derivative(*y)]
+        for row in DOPRI_A[1:]:
+            stage = tuple(y[d] + h * sum(a * k[j][d] for j, a in enumerate(row)) for d in (0, 1))
+            k.append(self.derivative(*stage))
+        y_new = stage
+
+        error = 0.0
+        for d in (0, 1):
+            err = h * sum(e * k[j][d] for j, e in enumerate(DOPRI_E))
+            scale = self.tolerance * (1.0 + max(abs(y[d]), abs(y_new[d])))
+            error += (err / scale) ** 2
+        return y_new, k, math.sqrt(0.5 * error)
+
+    def _advance_dopri5(self, dt):
+        # The integration front runs ahead of t_elapsed with its own step
+        # size, and the state at t_elapsed is read from the dense output, so
+        # a stream of small dt (the server polls with 0.002) does not force
+        # tiny steps. If the state was changed from outside, the front
+        # restarts from it.
+        t_end = self.t_elapsed + dt
+        if self._front is None or self._front[2] != (self.angle, self.angular_velocity):
+            self._front = (self.t_elapsed, (self.angle, self.angular_velocity), None)
+            self._dense = None
+        t, y, _ = self._front
+        h = self._step_size or dt
+        # events must be checked on every step before its dense output is replaced
+        if self.events and self._dense is not None:
+            self._check_events(min(t, t_end), self.dense_output(min(t, t_end)))
+
+        while t < t_end:
+            y_new, k, error = self._dopri5_step(y, h)
+            factor = 5.0 if error == 0.0 else min(5.0, max(0.2, 0.9 * error ** -0.2))
+            if error <= 1.0:
+                self._dense = (t, h, ("dopri5", y, y_new, k))
+                self._fsal = (y_new, k[-1])
+                t, y = t + h, y_new
+                if self.events and t < t_end:
+                    self._check_events(t, y)
+            h *= factor
+
+        self.angle, self.angular_velocity = self.dense_output(t_end) if self._dense else y
+        self.t_elapsed = t_end
+        if self.events:
+            self._check_events(t_end, (self.angle, self.angular_velocity))
+        self._step_size = h
+        self._front = (t, y, (self.angle, self.angular_velocity))
+
+    def dense_output(self, t):
+        # state inside the last step: dopri5 continuous extension, cubic
+        # Hermite between the step ends for the fixed-step integrators
+        if self._dense is None:
+            return self.angle, self.angular_velocity
+        t0, h, data = self._dense
+        s = min(1.0, max(0.0, (t - t0) / h))
+        if data[0] == "dopri5":
+            _, y0, y1, k = data
+            result = []
+            for d in (0, 1):
+                r2 = y1[d] - y0[d]
+                r3 = h * k[0][d] - r2
+                r4 = r2 - h * k[-1][d] - r3
+                r5 = h * sum(c * k[j][d] for j, c in enumerate(DOPRI_D))
+                result.append(y0[d] + s * (r2 + (1.0 - s) * (r3 + s * (r4 + (1.0 - s) * r5))))
+            return tuple(result)
+
+        _, y0, y1, slopes = data
+        if slopes is None:
+            slopes = data[3] = (self.derivative(*y0), self.derivative(*y1))
+        f0, f1 = slopes
+        h00 = (1.0 + 2.0 * s) * (1.0 - s) ** 2
+        h10 = s * (1.0 - s) ** 2
+        h01 = s * s * (3.0 - 2.0 * s)
+        h11 = s * s * (s - 1.0)
+        return tuple(h00 * y0[d] + h10 * h * f0[d] + h01 * y1[d] + h11 * h * f1[d] for d in (0, 1))
+
+    def add_event(self, func, direction=0, name=None):
+        event = Event(func, direction, name)
+        event._t = self.t_elapsed
+        event._value = func(self.t_elapsed, self.angle, self.angular_velocity)
+        self.events.append(event)
+        return event
+
+    def remove_event(self, event):
+        self.events.remove(event)
+
+    def _check_events(self, t1, y1):
+        # sign changes of every event function between its last check and t1;
+        # the last step's dense output must cover that interval
+        for event in self.events:
+            if event._t >= t1:
+                continue
+            g0 = event._value
+            g1 = event.func(t1, *y1)
+            rising = g0 < 0.0 <= g1
+            falling = g0 > 0.0 >= g1
+            if (rising and event.direction >= 0) or (falling and event.direction <= 0):
+                t = self._locate_event(event.func, event._t, g0, t1, g1)
+                event.times.append(t)
+                event.states.append(self.dense_output(t))
+            event._t, event._value = t1, g1
+
+    def _locate_event(self, func, t0, g0, t1, g1, xtol=1e-12, max_iterations=60):
+        # Illinois variant of regula falsi on the dense output: superlinear,
+        # and the root always stays bracketed
+        side = 0
+        t = t1
+        for _ in range(max_iterations):
+            t_prev = t
+            t = t1 - g1 * (t1 - t0) / (g1 - g0)
+            g = func(t, *self.dense_output(t))
+            if g == 0.0 or abs(t - t_prev) < xtol * max(1.0, abs(t)):
+                break
+            if (g > 0.0) == (g1 > 0.0):
+                t1, g1 = t, g
+                if side == 1:
+                    g0 *= 0.5
+                side = 1
+            else:
+                t0, g0 = t, g
+                if side == -1:
+                    g1 *= 0.5
+                side = -1
+        return t
+
+    def exact_period(self):
+        # period of the undamped oscillation at the initial amplitude: 4 K(k) / omega0
+        omega0_linear = math.sqrt(max(EPS, (self.mass * self.gravity * self.length) / self.I_total))
+        m = math.sin(0.5 * self.initial_angle) ** 2
+        if m >= 1.0 - EPS:
+            return math.inf
+        return 4.0 * ellipk(m) / omega0_linear
+
     def analytic_solution(self, t=None):
-        if t is None:
-            t = self.t_elapsed
+        # undamped: exact, sin(theta / 2) = k * sn(K(k) - omega0 * t, k) with
+        # k = sin(theta0 / 2); damped: linear oscillator at the exact frequency
+        scalar = t is None or np.ndim(t) == 0
+        t = np.asarray(self.t_elapsed if t is None else t, dtype=float)
 
         omega0_linear = math.sqrt(
             max(EPS, (self.mass * self.gravity * self.length) / self.I_total)
         )
 
-        amplitude = abs(self.initial_angle)
-        if amplitude > 1e-6:
-            freq_correction = (
-                1.0 + (1.0 / 16.0) * amplitude**2 + (11.0 / 3072.0) * amplitude**4
-            )
-            omega0 = omega0_linear / freq_correction
+        k = math.sin(0.5 * self.initial_angle)
+        m = k * k
+        # released from the top (theta0 = pi) the pendulum never leaves it
+        separatrix = m >= 1.0 - EPS
+        K = math.inf if separatrix else ellipk(m)
+        omega0 = 0.0 if separatrix else 0.5 * math.pi * omega0_linear / K
+
+        if abs(self.damping) < EPS:
+            if separatrix:
+                theta_analytic = np.full_like(t, self.initial_angle)
+                omega_analytic = np.zeros_like(t)
+            else:
+                sn, cn, _ = ellipj(K - omega0_linear * t, m)
+                theta_analytic = 2.0 * np.arcsin(k * sn)
+                omega_analytic = -2.0 * k * omega0_linear * cn
         else:
-            omega0 = omega0_linear
+            theta_analytic, omega_analytic = self._damped_solution(t, omega0)
+
+        if scalar:
+            return float(theta_analytic), float(omega_analytic), omega0
+        return theta_analytic, omega_analytic, omega0
 
+    def _damped_solution(self, t, omega0):
         beta = 0.5 * self.damping
 
         discriminant = omega0 * omega0 - beta * beta
@@ -145,26 +406,27 @@ class Pendulum:
             gamma2 = -beta - math.sqrt(beta * beta - omega0 * omega0)
             A = self.initial_angle * gamma2 / (gamma2 - gamma1)
             B = self.initial_angle * gamma1 / (gamma1 - gamma2)
-            theta_analytic = A * math.exp(gamma1 * t) + B * math.exp(gamma2 * t)
-            omega_analytic = A * gamma1 * math.exp(gamma1 * t) + B * gamma2 * math.exp(
+            theta_analytic = A * np.exp(gamma1 * t) + B * np.exp(gamma2 * t)
+            omega_analytic = A * gamma1 * np.exp(gamma1 * t) + B * gamma2 * np.exp(
                 gamma2 * t
             )
-            return theta_analytic, omega_analytic, omega0
+            return theta_analytic, omega_analytic
 
         omega = math.sqrt(max(EPS, discriminant))
-        decay = math.exp(-beta * t)
+        decay = np.exp(-beta * t)
 
-        theta_analytic = self.initial_angle * decay * math.cos(omega * t)
+        theta_analytic = self.initial_angle * decay * np.cos(omega * t)
         omega_analytic = (
             -self.initial_angle
             * decay
-            * (beta * math.cos(omega * t) + omega * math.sin(omega * t))
+            * (beta * np.cos(omega * t) + omega * np.sin(omega * t))
         )
 
-        return theta_analytic, omega_analytic, omega0
+        return theta_analytic, omega_analytic
 
-    def match_percent(self):
-        theta_analytic, _, _ = self.analytic_solution()
+    def match_percent(self, theta_analytic=None):
+        if theta_analytic is None:
+            theta_analytic, _, _ = self.analytic_solution()
         amplitude_ref = max(abs(self.initial_angle), 1e-3)
         error = abs(self.angle - theta_analytic)
         norm_error = error / amplitude_ref
@@ -196,13 +458,15 @@ class Pendulum:
             "analyticAngle": theta_analytic,
             "analyticAngularVelocity": omega_analytic,
             "analyticOmega0": omega0,
-            "matchPercent": self.match_percent(),
+            "matchPercent": self.match_percent(theta_analytic),
             "time": self.t_elapsed,
             "initialAngle": self.initial_angle,
             "energy": current_energy,
             "energyDeviation": energy_deviation,
             "energyTolerance": self.energy_tolerance * 100,
             "maxRelEnergyDeviation": self.max_rel_energy_deviation,
+            "integrator": self.integrator,
+            "forceEvaluations": self.force_evaluations,
         }
 
     def get_position(self):
@@ -242,6 +506,8 @@ class PendulumAPIHandler(BaseHTTPRequestHandler):
                 damping = float(query.get("damping", [0.01])[0])
                 shape = query.get("shape", ["point"])[0]
                 bob_size = float(query.get("bobSize", [0.05])[0])
+                integrator = query.get("integrator", ["auto"])[0]
+                tolerance = float(query.get("tolerance", [1e-8])[0])
 
                 angle = max(-math.pi, min(math.pi, angle))
                 length = max(0.01, min(10.0, length))
@@ -250,6 +516,9 @@ class PendulumAPIHandler(BaseHTTPRequestHandler):
                 if shape not in ("point", "disk", "rod", "sphere"):
                     shape = "point"
                 bob_size = max(1e-4, min(10.0, bob_size))
+                if integrator not in INTEGRATORS:
+                    integrator = "auto"
+                tolerance = max(1e-12, min(1e-3, tolerance))
             except (ValueError, TypeError):
                 angle = 0.8
                 length = 1.0
@@ -257,6 +526,8 @@ class PendulumAPIHandler(BaseHTTPRequestHandler):
                 damping = 0.1
                 shape = "point"
                 bob_size = 0.05
+                integrator = "auto"
+                tolerance = 1e-8
 
             self.pendulum = Pendulum(
                 length=length,
@@ -266,6 +537,8 @@ class PendulumAPIHandler(BaseHTTPRequestHandler):
                 damping=damping,
                 shape=shape,
                 bob_size=bob_size,
+                integrator=integrator,
+                tolerance=tolerance,
             )
             self.pendulum.t_elapsed = 0.0
             self.pendulum.initial_angle = angle
@@ -278,12 +551,27 @@ class PendulumAPIHandler(BaseHTTPRequestHandler):
                 ).encode()
             )
 
+        elif parsed_path.path == "/api/energy_history":
+            query = parse_qs(parsed_path.query)
+            try:
+                points = max(1, min(10000, int(query.get("points", [500])[0])))
+                level = query.get("level", [None])[0]
+                level = None if level is None else int(level)
+            except (ValueError, TypeError):
+                points = 500
+                level = None
+
+            self._set_headers()
+            self.wfile.write(
+                json.dumps(self.pendulum.energy_history.query(points, level)).encode()
+            )
+
         elif parsed_path.path == "/api/info":
             self._set_headers()
             info = {
                 "name": "Pendulum Physics API",
                 "version": "1.1.2",
-                "endpoints": ["/api/state", "/api/reset", "/api/info"],
+                "endpoints": ["/api/state", "/api/reset", "/api/energy_history", "/api/info"],
                 "notes": "Supports physical pendulum shapes with accurate physics simulation",
             }
             self.wfile.write(json.dumps(info).encode())
@@ -297,7 +585,7 @@ def run_server(port=8000):
     server_address = ("", port)
     httpd = HTTPServer(server_address, PendulumAPIHandler)
     print(f"Pendulum API server running on http://localhost:{port}")
-    print("Endpoints: /api/state, /api/reset, /api/info")
+    print("Endpoints: /api/state, /api/reset, /api/energy_history, /api/info")
     print("Press Ctrl+C to stop")
     httpd.serve_forever()
 
@@ -0,0 +1,54 @@
+import math
+
+import pytest
+
+from analysis import analyze_oscillation, angle_zero
+from pendulum import Pendulum
+
+
+@pytest.mark.parametrize(
+    "integrator, dt, tolerance", [("dopri5", 0.002, 1e-6), ("dopri5", 0.2, 1e-6), ("rk4", 0.05, 1e-4)]
+)
+def test_event_times_do_not_depend_on_step(integrator, dt, tolerance):
+    pend = Pendulum(angle=1.0, damping=0.0, integrator=integrator)
+    period = pend.exact_period()
+    falling = pend.add_event(angle_zero, direction=-1)
+    rising = pend.add_event(angle_zero, direction=1)
+    while pend.t_elapsed < 2 * period:
+        pend.update(dt)
+    # released from rest at a positive angle: down through zero at T/4, up at 3T/4
+    assert falling.times == pytest.approx([0.25 * period, 1.25 * period], abs=tolerance)
+    assert rising.times == pytest.approx([0.75 * period, 1.75 * period], abs=tolerance)
+    assert falling.states[0][0] == pytest.approx(0.0, abs=tolerance)
+    assert falling.states[0][1] < 0
+
+
+def test_removed_event_stops_recording():
+    pend = Pendulum(angle=1.0, damping=0.0)
+    event = pend.add_event(angle_zero)
+    pend.remove_event(event)
+    for _ in range(500):
+        pend.update(0.01)
+    assert event.times == []
+
+
+def test_undamped_period_is_exact():
+    pend = Pendulum(angle=2.0, damping=0.0, integrator="dopri5")
+    result = analyze_oscillation(pend, n_periods=4, dt=0.1)
+    assert result["period"] == pytest.approx(pend.exact_period(), rel=1e-6)
+    assert result["amplitudes"] == pytest.approx([2.0] * len(result["amplitudes"]), abs=1e-6)
+    # events are removed after the analysis
+    assert pend.events == []
+
+
+def test_damped_amplitude_decays_at_half_the_damping():
+    pend = Pendulum(angle=0.05, damping=0.2, integrator="dopri5")
+    result = analyze_oscillation(pend, n_periods=6, dt=0.05)
+    assert result["decay_rate"] == pytest.approx(0.1, rel=1e-2)
+    assert result["log_decrement"] == pytest.approx(0.1 * result["period"], rel=1e-2)
+
+
+def test_period_is_nan_without_enough_crossings():
+    pend = Pendulum(angle=1.0, damping=0.0, length=1000.0)
+    result = analyze_oscillation(pend, n_periods=5, dt=0.1, max_time=5.0)
+    assert math.isnan(result["period"])
@@ -0,0 +1,58 @@
+import math
+
+import numpy as np
+import pytest
+
+from elliptic import ellipj, ellipk
+from pendulum import Pendulum
+
+
+def test_ellipk_reference_values():
+    assert ellipk(0.0) == pytest.approx(math.pi / 2, rel=1e-15)
+    # Abramowitz & Stegun, table 17.1
+    assert ellipk(0.5) == pytest.approx(1.8540746773013719, rel=1e-14)
+    assert ellipk(0.99) == pytest.approx(3.6956373629898747, rel=1e-14)
+
+
+@pytest.mark.parametrize("m", [0.0, 0.3, 0.9, 0.999])
+def test_ellipj_identities(m):
+    u = np.linspace(-5.0, 5.0, 101)
+    sn, cn, dn = ellipj(u, m)
+    np.testing.assert_allclose(sn**2 + cn**2, 1.0, atol=1e-13)
+    np.testing.assert_allclose(dn**2 + m * sn**2, 1.0, atol=1e-13)
+    assert ellipj(ellipk(m), m)[0] == pytest.approx(1.0, abs=1e-12)
+
+
+def test_ellipj_reduces_to_trigonometric_functions():
+    u = np.linspace(0.0, 10.0, 11)
+    sn, cn, dn = ellipj(u, 0.0)
+    np.testing.assert_allclose(sn, np.sin(u), atol=1e-15)
+    np.testing.assert_allclose(cn, np.cos(u), atol=1e-15)
+    np.testing.assert_allclose(dn, 1.0)
+
+
+@pytest.mark.parametrize("m", [-0.1, 1.0])
+def test_parameter_outside_range_is_rejected(m):
+    with pytest.raises(ValueError):
+        ellipk(m)
+
+
+@pytest.mark.parametrize("angle", [0.5, 2.0, 3.1])
+def test_analytic_solution_turning_points(angle):
+    pend = Pendulum(angle=angle, damping=0.0)
+    period = pend.exact_period()
+    theta, omega, _ = pend.analytic_solution(np.array([0.0, 0.5 * period, period]))
+    np.testing.assert_allclose(theta, [angle, -angle, angle], atol=1e-10)
+    np.testing.assert_allclose(omega, 0.0, atol=1e-8)
+
+
+def test_analytic_solution_conserves_energy():
+    pend = Pendulum(angle=2.5, damping=0.0)
+    theta, omega, _ = pend.analytic_solution(np.linspace(0.0, 10.0, 200))
+    energy = 0.5 * pend.I_total * omega**2 + pend.mass * pend.gravity * pend.length * (1 - np.cos(theta))
+    np.testing.assert_allclose(energy, pend.initial_energy, rtol=1e-10)
+
+
+def test_small_amplitude_period_is_linear():
+    pend = Pendulum(angle=1e-4, damping=0.0)
+    assert pend.exact_period() == pytest.approx(2 * math.pi * math.sqrt(1.0 / 9.81), rel=1e-8)
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from ensemble import PendulumEnsemble
+from pendulum import Pendulum
+
+PARAMS = dict(
+    length=[1.0, 0.5, 2.0, 1.0],
+    angle=[0.3, 1.0, 2.0, 2.5],
+    damping=[0.0, 0.1, 0.0, 0.5],
+    shape=["point", "disk", "rod", "sphere"],
+    bob_size=0.2,
+)
+
+
+def single(k):
+    return Pendulum(**{name: value[k] if isinstance(value, list) else value for name, value in PARAMS.items()})
+
+
+def test_matches_single_pendulums():
+    # each element must follow the scheme Pendulum.update picks for it
+    ensemble = PendulumEnsemble(**PARAMS)
+    ensemble.run(0.01, 1000)
+    for k in range(len(ensemble)):
+        pend = single(k)
+        for _ in range(1000):
+            pend.update(0.01)
+        assert ensemble.angle[k] == pytest.approx(pend.angle, abs=1e-12)
+        assert ensemble.angular_velocity[k] == pytest.approx(pend.angular_velocity, abs=1e-12)
+
+
+def test_parameters_broadcast():
+    ensemble = PendulumEnsemble(angle=np.linspace(0.1, 1.5, 15), damping=0.0)
+    assert len(ensemble) == 15
+    assert ensemble.length.shape == (15,)
+
+
+def test_measured_periods_match_exact_period():
+    angles = np.array([0.2, 1.0, 2.0, 2.8])
+    periods = PendulumEnsemble(angle=angles, damping=0.0).measure_periods(0.01)
+    exact = [Pendulum(angle=angle, damping=0.0).exact_period() for angle in angles]
+    np.testing.assert_allclose(periods, exact, rtol=1e-4)
+
+
+def test_too_few_crossings_give_nan():
+    periods = PendulumEnsemble(angle=[1.0, 1.0], length=[1.0, 1000.0], damping=0.0).measure_periods(
+        0.05, max_time=10.0
+    )
+    assert np.isfinite(periods[0])
+    assert np.isnan(periods[1])
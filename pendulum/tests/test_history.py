@@ -0,0 +1,54 @@
+import pytest
+
+from history import EnergyHistory
+
+
+def filled(n, **kwargs):
+    history = EnergyHistory(**kwargs)
+    for k in range(n):
+        history.append(0.01 * k, float(k % 97))
+    return history
+
+
+def test_short_history_is_returned_raw():
+    result = filled(300).query(500)
+    assert result["level"] == 0
+    assert result["samplesPerPoint"] == 1
+    assert result["mean"] == [float(k % 97) for k in range(300)]
+
+
+def test_finest_level_covering_the_span_is_merged_to_budget():
+    # level 3 would fit the budget directly but with only 48 points
+    result = filled(200_000).query(500)
+    assert result["level"] == 2
+    assert 250 < len(result["time"]) <= 500
+    assert result["samplesPerPoint"] == 16**2 * 2
+    assert result["time"][0] == 0.0
+
+
+def test_coarsest_level_when_nothing_covers_the_span():
+    history = filled(5000, capacity=16, factor=4, levels=3)
+    assert history.select_level(500) == 2
+    assert len(history.query(500)["time"]) == 16
+
+
+def test_merged_buckets_keep_extremes():
+    history = filled(2000, capacity=4096)
+    result = history.query(10)
+    assert len(result["time"]) == 10
+    assert min(result["min"]) == 0.0
+    assert max(result["max"]) == 96.0
+
+
+def test_explicit_level_is_clamped():
+    history = filled(100)
+    assert history.query(level=9)["level"] == len(history.levels) - 1
+    assert history.query(level=-1)["level"] == 0
+
+
+def test_memory_is_bounded():
+    history = filled(100_000, capacity=64, factor=8, levels=3)
+    assert len(history) == 100_000
+    assert all(len(level) <= 64 for level in history.levels)
+    # 1562 complete buckets of 64 samples, the ring keeps the newest 64
+    assert history.levels[2].ordered("time")[0] == pytest.approx(0.01 * 64 * (1562 - 64))
@@ -0,0 +1,65 @@
+import pytest
+
+from pendulum import Pendulum
+
+
+def max_error(integrator, dt, angle=2.0, t_end=10.0, **kwargs):
+    # largest deviation of the angle from the elliptic solution along the run
+    pend = Pendulum(angle=angle, damping=0.0, integrator=integrator, **kwargs)
+    error = 0.0
+    for k in range(int(round(t_end / dt))):
+        pend.update(dt)
+        theta, _, _ = pend.analytic_solution((k + 1) * dt)
+        error = max(error, abs(pend.angle - theta))
+    return error
+
+
+@pytest.mark.parametrize(
+    "integrator, dt, bound",
+    [("verlet", 0.01, 2e-3), ("rk4", 0.02, 2e-6), ("yoshida4", 0.01, 2e-6), ("dopri5", 0.01, 5e-6)],
+)
+@pytest.mark.parametrize("angle", [0.3, 2.0])
+def test_matches_elliptic_solution(integrator, dt, bound, angle):
+    assert max_error(integrator, dt, angle=angle) < bound
+
+
+@pytest.mark.parametrize("integrator, order", [("verlet", 2), ("yoshida4", 4)])
+def test_convergence_order(integrator, order):
+    ratio = max_error(integrator, 0.02) / max_error(integrator, 0.01)
+    assert ratio == pytest.approx(2**order, rel=0.1)
+
+
+def test_rk4_error_drops_with_step():
+    assert max_error("rk4", 0.01) < max_error("rk4", 0.02) / 8
+
+
+def test_dopri5_error_follows_tolerance():
+    loose = max_error("dopri5", 0.01, tolerance=1e-6)
+    tight = max_error("dopri5", 0.01, tolerance=1e-9)
+    assert tight < 1e-6
+    assert tight < loose / 100
+
+
+def test_dopri5_does_not_depend_on_poll_interval():
+    # the state at t_elapsed comes from the dense output, not from a step ending there
+    fine = Pendulum(angle=2.0, damping=0.0, integrator="dopri5")
+    coarse = Pendulum(angle=2.0, damping=0.0, integrator="dopri5")
+    for _ in range(2500):
+        fine.update(0.002)
+    for _ in range(50):
+        coarse.update(0.1)
+    assert fine.angle == pytest.approx(coarse.angle, abs=1e-6)
+    assert fine.force_evaluations < 2 * coarse.force_evaluations
+
+
+def test_energy_is_conserved_without_damping():
+    pend = Pendulum(angle=2.5, damping=0.0, integrator="yoshida4")
+    for _ in range(5000):
+        pend.update(0.01)
+    assert pend.max_rel_energy_deviation < 1e-5
+
+
+def test_unknown_integrator_is_rejected():
+    with pytest.raises(ValueError):
+        Pendulum(integrator="euler")
+